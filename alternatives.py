@@ -0,0 +1,96 @@
+import heapq
+import itertools
+
+# Trasa zwracana przez Graph.alternatives
+class Route:
+    def __init__(self, path: list, used_edges: list, cost: float):
+        self.path = path
+        self.used_edges = used_edges
+        self.cost = cost  # koszt w metryce zapytania (bez kar)
+        self.length = sum(edge.length for edge in used_edges)
+        self.overlap = 0.0  # największa część długości wspólna z którąś z wcześniejszych tras
+
+# Część długości trasy route przebiegająca tymi samymi drogami (id_road) co trasa other
+def overlap_ratio(route: Route, other: Route) -> float:
+    if route.length == 0:
+        return 1.0
+    roads = {edge.id_road for edge in other.used_edges}
+    return sum(edge.length for edge in route.used_edges if edge.id_road in roads) / route.length
+
+def _finish(routes: list) -> list:
+    for i, route in enumerate(routes):
+        route.overlap = max([overlap_ratio(route, other) for other in routes[:i]], default=0.0)
+    return routes
+
+# Metoda kar: po każdym wyszukiwaniu koszt użytych dróg (w obu kierunkach) jest mnożony przez penalty.
+# Kary są nakładką na koszty tylko dla tego zapytania - graf nie jest modyfikowany.
+# Trasy o udziale wspólnej długości powyżej max_overlap są pomijane.
+def penalty_alternatives(graph, a, b, k: int = 3, cost: str = 'time_cost', penalty: float = 2.0,
+                         max_overlap: float = 1.0, max_attempts: int = None) -> list:
+    weight = graph.edge_weight(cost)
+    heuristic = graph.default_heuristic(cost)  # kary >= 1, więc heurystyka pozostaje dopuszczalna
+    factors = dict()  # id_road -> mnożnik kosztu
+    routes = []
+    seen = set()
+
+    for _ in range(max_attempts or 3 * k):
+        if len(routes) >= k:
+            break
+        path, used_edges = graph._astar(a, b, lambda edge: weight(edge) * factors.get(edge.id_road, 1), heuristic)
+        if path is None:
+            break
+        key = tuple(edge.index for edge in used_edges)
+        if key not in seen:
+            seen.add(key)
+            route = Route(path, used_edges, sum(weight(edge) for edge in used_edges))
+            if not routes or max(overlap_ratio(route, other) for other in routes) <= max_overlap:
+                routes.append(route)
+        for edge in used_edges:
+            factors[edge.id_road] = factors.get(edge.id_road, 1) * penalty
+
+    return _finish(routes)
+
+# Algorytm Yena - k najkrótszych tras bez pętli, w kolejności rosnącego kosztu
+def yen_alternatives(graph, a, b, k: int = 3, cost: str = 'time_cost') -> list:
+    weight = graph.edge_weight(cost)
+    heuristic = graph.default_heuristic(cost)
+    path, used_edges = graph._astar(a, b, weight, heuristic)
+    if path is None:
+        return []
+
+    routes = [Route(path, used_edges, sum(weight(edge) for edge in used_edges))]
+    seen = {tuple(edge.index for edge in used_edges)}
+    candidates = []  # (koszt, licznik, ścieżka, krawędzie)
+    counter = itertools.count()
+
+    while len(routes) < k:
+        last = routes[-1]
+        for i in range(len(last.path) - 1):
+            spur_node = last.path[i]
+            root_edges = last.used_edges[:i]
+            # krawędzie wychodzące z węzła odgałęzienia, którymi poszły trasy o tym samym początku
+            banned_edges = {route.used_edges[i].index for route in routes
+                            if len(route.used_edges) > i and route.used_edges[:i] == root_edges}
+            banned_nodes = set(last.path[:i])  # trasa nie może wrócić do początkowego odcinka
+
+            def spur_weight(edge):
+                if edge.index in banned_edges or graph.nodes[edge.id_to] in banned_nodes:
+                    return float('inf')
+                return weight(edge)
+
+            spur_path, spur_edges = graph._astar(spur_node, b, spur_weight, heuristic)
+            if spur_path is None:
+                continue
+            edges = root_edges + spur_edges
+            key = tuple(edge.index for edge in edges)
+            if key not in seen:
+                seen.add(key)
+                heapq.heappush(candidates, (sum(weight(edge) for edge in edges), next(counter),
+                                            last.path[:i] + spur_path, edges))
+
+        if not candidates:
+            break
+        route_cost, _, path, used_edges = heapq.heappop(candidates)
+        routes.append(Route(path, used_edges, route_cost))
+
+    return _finish(routes)
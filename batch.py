@@ -0,0 +1,79 @@
+import multiprocessing
+import time
+import numpy as np
+from multiprocessing import shared_memory
+
+from csr import CSRGraph, MAX_SPEED
+
+CSR_ARRAYS = ('x', 'y', 'offsets', 'targets', 'length', 'time_cost', 'road_id', 'edge_id')
+
+# Metryka i prędkość heurystyki dla algorytmów CSRGraph (prędkość 0 oznacza Dijkstrę)
+ALGORITHMS = {
+    'astar_fastest': ('time_cost', MAX_SPEED),
+    'astar': ('length', 1),
+    'dijkstra': ('length', 0),
+}
+
+# Tablice CSRGraph skopiowane raz do pamięci współdzielonej. Procesy robocze dostają tylko
+# opis bloków (nazwa, typ, kształt) i mapują je bez kopiowania i bez serializacji grafu.
+class SharedCSR:
+    def __init__(self, csr: CSRGraph):
+        self.blocks = []
+        self.descriptor = dict()  # nazwa tablicy -> (nazwa bloku, typ, kształt)
+        for name in CSR_ARRAYS:
+            array = np.ascontiguousarray(getattr(csr, name))
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            self.blocks.append(block)
+            self.descriptor[name] = (block.name, array.dtype.str, array.shape)
+
+    # Graf CSR na tablicach z bloków pamięci współdzielonej (wywoływane w procesie roboczym)
+    @staticmethod
+    def attach(descriptor: dict) -> tuple:
+        blocks = []
+        arrays = []
+        for name in CSR_ARRAYS:
+            block_name, dtype, shape = descriptor[name]
+            block = shared_memory.SharedMemory(name=block_name)
+            blocks.append(block)
+            arrays.append(np.ndarray(shape, dtype=dtype, buffer=block.buf))
+        return CSRGraph(*arrays), blocks
+
+    def close(self):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# Stan procesu roboczego: graf i uchwyty bloków (muszą żyć tak długo jak tablice)
+_graph = None
+_blocks = None
+
+def _init_worker(descriptor: dict):
+    global _graph, _blocks
+    _graph, _blocks = SharedCSR.attach(descriptor)
+
+def _route(task: tuple) -> tuple:
+    algorithm, a, b = task
+    cost, speed = ALGORITHMS[algorithm]
+    start = time.perf_counter()
+    path, used_edges, total = _graph._astar(a, b, getattr(_graph, cost), speed)
+    return path, used_edges, total, time.perf_counter() - start
+
+# Wsadowe wyznaczanie tras dla par (a, b) indeksów węzłów CSRGraph (np. z csr.nearest_node) w puli procesów.
+# Wyniki (ścieżka, pozycje krawędzi, koszt, czas zapytania w s) zwracane są w kolejności zapytań;
+# brak trasy to (None, [], inf, czas).
+def route_batch(csr: CSRGraph, queries: list, algorithm: str = 'astar_fastest', processes: int = None,
+                chunksize: int = 64) -> list:
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Nieznany algorytm {algorithm}.")
+    tasks = [(algorithm, int(a), int(b)) for a, b in queries]
+    with SharedCSR(csr) as shared:
+        with multiprocessing.Pool(processes, initializer=_init_worker, initargs=(shared.descriptor,)) as pool:
+            return pool.map(_route, tasks, chunksize)
@@ -0,0 +1,124 @@
+import argparse
+import json
+import os
+import platform
+import time
+import tracemalloc
+import numpy as np
+
+from classes import Graph
+from loader import load_graph, load_simplified_graph
+from pqueue import BinaryHeap, IndexedHeap
+from search_stats import SearchStats
+from spatial import SpatialIndex
+from turns import TurnModel
+
+DEFAULT_SHP = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data',
+                           'PL.PZGiK.994.BDOT10k.0463__OT_SKJZ_L.shp')
+ALGORITHMS = ('astar', 'astar_fastest', 'dijkstra', 'astar_turns')
+QUEUES = {'binary': BinaryHeap, 'indexed': IndexedHeap}
+
+def percentiles(values: list) -> dict:
+    if not values:
+        return {'p50': None, 'p95': None, 'p99': None, 'mean': None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99]).tolist()
+    return {'p50': p50, 'p95': p95, 'p99': p99, 'mean': float(np.mean(values))}
+
+# Pomiar wczytania grafu, przyciągania punktów i zapytań dla powtarzalnego (seed) zbioru losowych par
+# punktów z zasięgu warstwy. Czasy w sekundach, pamięć w bajtach (szczyt alokacji przy wczytaniu grafu).
+# Wczytanie mierzone jest dwa razy: czas bez tracemalloc (który spowalnia alokacje kilkukrotnie),
+# a pamięć w osobnym przebiegu ze śledzeniem alokacji.
+# simplify=True - graf po scaleniu łańcuchów węzłów stopnia 2 (raport uproszczenia w wyniku),
+# queue - kolejka wyszukiwań Graph (klucz QUEUES), verify_turns=True - porównanie kosztów astar_turns
+# z wyszukiwaniem po pełnym grafie krawędziowym (turns.line_graph_cost), liczba różnic w 'mismatches'.
+def run_benchmark(shp_path: str = DEFAULT_SHP, pairs: int = 100, seed: int = 0, algorithms: tuple = ALGORITHMS,
+                  tolerance: float = 1, simplify: bool = False, queue: str = 'binary', verify_turns: bool = False) -> dict:
+    def load():
+        if simplify:
+            return load_simplified_graph(shp_path, Graph(tolerance))
+        return load_graph(shp_path, Graph(tolerance)), None
+
+    tracemalloc.start()
+    load()
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    graph, simplify_report = load()
+    load_time = time.perf_counter() - start
+    graph.queue = QUEUES[queue]
+
+    start = time.perf_counter()
+    index = SpatialIndex(graph)
+    index_time = time.perf_counter() - start
+
+    rng = np.random.default_rng(seed)
+    points = np.column_stack([rng.uniform(index.x.min(), index.x.max(), 2 * pairs),
+                              rng.uniform(index.y.min(), index.y.max(), 2 * pairs)])
+    start = time.perf_counter()
+    keys = index.snap(points)
+    snap_time = time.perf_counter() - start
+    queries = [(graph.nodes[keys[2 * i]], graph.nodes[keys[2 * i + 1]]) for i in range(pairs)]
+
+    turn_model = TurnModel(graph)  # astar_turns - najszybsza trasa z karami za skręty (po krawędziach)
+    results = dict()
+    for algorithm in algorithms:
+        search = turn_model.astar_fastest if algorithm == 'astar_turns' else getattr(graph, algorithm)
+        latencies = []
+        query_stats = []
+        found = 0
+        for a, b in queries:
+            stats = SearchStats()
+            start = time.perf_counter()
+            result = search(a, b, stats=stats)
+            latencies.append(time.perf_counter() - start)
+            query_stats.append(stats)
+            found += (result[-1] if algorithm == 'dijkstra' else result[0]) not in (None, float('inf'))
+        results[algorithm] = {'latency': percentiles(latencies),
+                              'settled': percentiles([stats.settled for stats in query_stats]),
+                              'pushes': percentiles([stats.pushes for stats in query_stats]),
+                              'stale_pops': percentiles([stats.stale_pops for stats in query_stats]),
+                              'heap_max': percentiles([stats.heap_max for stats in query_stats]),
+                              'total': SearchStats.aggregate(query_stats).as_dict(), 'found': found}
+
+    # narzut wyszukiwania po krawędziach względem zwykłego A* (stany, czas, dodatkowa pamięć modelu)
+    if 'astar_turns' in results and 'astar_fastest' in results:
+        plain, turns = results['astar_fastest']['total'], results['astar_turns']['total']
+        results['astar_turns']['overhead'] = {
+            'settled_ratio': turns['settled'] / plain['settled'] if plain['settled'] else None,
+            'time_ratio': turns['wall_time'] / plain['wall_time'] if plain['wall_time'] else None,
+            'cached_intersections': len(turn_model.intersections),
+        }
+    if verify_turns and 'astar_turns' in results:
+        results['astar_turns']['mismatches'] = len(turn_model.verify(queries))
+
+    return {
+        'shp_path': shp_path, 'pairs': pairs, 'seed': seed, 'tolerance': tolerance, 'queue': queue,
+        'python': platform.python_version(), 'numpy': np.__version__, 'platform': platform.platform(),
+        'nodes': len(graph.nodes), 'edges': len(graph.edges), 'simplify': simplify_report,
+        'load_time': load_time, 'peak_memory': peak_memory,
+        'index_time': index_time, 'snap_time': snap_time,
+        'algorithms': results,
+    }
+
+# Uruchomienie: python benchmark.py --pairs 200 --seed 1 --output wynik.json
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark wyszukiwania tras na warstwie BDOT10k")
+    parser.add_argument('--shp', default=DEFAULT_SHP)
+    parser.add_argument('--pairs', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--algorithms', nargs='+', default=list(ALGORITHMS), choices=ALGORITHMS)
+    parser.add_argument('--simplify', action='store_true', help="scalenie łańcuchów węzłów stopnia 2 przed pomiarem")
+    parser.add_argument('--queue', default='binary', choices=list(QUEUES), help="kolejka wyszukiwań Graph")
+    parser.add_argument('--verify-turns', action='store_true',
+                        help="sprawdzenie astar_turns wyszukiwaniem po pełnym grafie krawędziowym")
+    parser.add_argument('--output', help="plik JSON z wynikami (domyślnie wypisanie na ekran)")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.shp, args.pairs, args.seed, tuple(args.algorithms), simplify=args.simplify,
+                           queue=args.queue, verify_turns=args.verify_turns)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
@@ -0,0 +1,275 @@
+import heapq
+import numpy as np
+
+# Krawędzie skierowane grafu w stałej kolejności (węzły w kolejności Graph.nodes, potem edges_out)
+# - kolejność jest odtwarzalna, więc pozycje krawędzi można zapisać na dysku
+def graph_edges(graph) -> tuple:
+    nodes = list(graph.nodes.values())
+    index = {node: i for i, node in enumerate(nodes)}
+    edges = []
+    arcs = []  # (węzeł początkowy, węzeł końcowy, pozycja krawędzi)
+    for u, node in enumerate(nodes):
+        for edge in node.edges_out:
+            arcs.append((u, index[graph.nodes[edge.id_to]], len(edges)))
+            edges.append(edge)
+    return nodes, index, edges, arcs
+
+# Hierarchie skrótów (Contraction Hierarchies) dla statycznej sieci drogowej.
+# Węzły są kolejno "kontraktowane" od najmniej ważnych, a ścieżki przechodzące przez usunięty
+# węzeł zastępowane skrótami. Zapytanie to dwukierunkowy Dijkstra idący tylko w górę hierarchii.
+class ContractionHierarchy:
+    def __init__(self, graph, cost: str, rank: list, arcs: dict):
+        self.graph = graph
+        self.cost = cost  # 'length', 'time_cost' albo nazwa profilu
+        self.nodes, self.index, self.edges, _ = graph_edges(graph)
+        self.rank = rank
+        self.arcs = arcs  # klucze (u, v), wartości (koszt, węzeł pośredni skrótu lub -1, pozycja krawędzi lub -1)
+
+        # łuki w górę hierarchii: up_out dla wyszukiwania w przód, up_in dla wyszukiwania wstecz
+        self.up_out = [[] for _ in self.nodes]
+        self.up_in = [[] for _ in self.nodes]
+        for (u, v), (w, _, _) in arcs.items():
+            if rank[u] < rank[v]:
+                self.up_out[u].append((v, w))
+            else:
+                self.up_in[v].append((u, w))
+
+        # Po zmianie kosztów (Graph.update_road) skróty mogą być nieaktualne - hierarchię trzeba zbudować ponownie
+        self.stale = False
+        graph.add_listener(self._invalidate)
+
+    def _invalidate(self, graph, id_road):
+        self.stale = True
+
+    def _check(self):
+        if self.stale:
+            raise ValueError("Hierarchia jest nieaktualna po zmianie kosztów dróg - należy ją zbudować ponownie.")
+
+    @classmethod
+    def build(cls, graph, cost: str = 'time_cost', witness_limit: int = 50):
+        nodes, _, edges, graph_arcs = graph_edges(graph)
+        weight = graph.edge_weight(cost)
+        out_adj = [dict() for _ in nodes]  # out_adj[u][v] = (koszt, pośredni, pozycja krawędzi)
+        in_adj = [dict() for _ in nodes]
+        for u, v, e in graph_arcs:
+            if u == v:
+                continue
+            w = weight(edges[e])
+            if v not in out_adj[u] or w < out_adj[u][v][0]:  # z krawędzi równoległych zostaje najtańsza
+                out_adj[u][v] = (w, -1, e)
+                in_adj[v][u] = (w, -1, e)
+
+        # Lokalne wyszukiwanie ścieżek świadków u -> cele z pominięciem węzła v
+        def witness_search(source, excluded, targets, max_cost):
+            dist = {source: 0}
+            queue = [(0, source)]
+            remaining = set(targets)
+            settled = 0
+            while queue and remaining:
+                d, x = heapq.heappop(queue)
+                if d > dist[x]:
+                    continue
+                if d > max_cost or settled >= witness_limit:
+                    break
+                settled += 1
+                remaining.discard(x)
+                for y, (w, _, _) in out_adj[x].items():
+                    if y == excluded:
+                        continue
+                    new_d = d + w
+                    if new_d < dist.get(y, float('inf')):
+                        dist[y] = new_d
+                        heapq.heappush(queue, (new_d, y))
+            return dist
+
+        # Skróty potrzebne po usunięciu węzła v
+        def shortcuts(v):
+            result = []
+            if not out_adj[v]:
+                return result
+            max_out = max(w for w, _, _ in out_adj[v].values())
+            for u, (w_in, _, _) in in_adj[v].items():
+                dist = witness_search(u, v, out_adj[v], w_in + max_out)
+                for x, (w_out, _, _) in out_adj[v].items():
+                    if x != u and dist.get(x, float('inf')) > w_in + w_out:
+                        result.append((u, x, w_in + w_out))
+            return result
+
+        deleted = [0] * len(nodes)  # liczba skontraktowanych sąsiadów
+
+        # Kolejność kontrakcji: różnica krawędzi (skróty - usunięte łuki) plus liczba usuniętych sąsiadów
+        def priority(v):
+            return 2 * (len(shortcuts(v)) - len(in_adj[v]) - len(out_adj[v])) + deleted[v]
+
+        priorities = [priority(v) for v in range(len(nodes))]
+        queue = [(p, v) for v, p in enumerate(priorities)]
+        heapq.heapify(queue)
+        contracted = [False] * len(nodes)
+        rank = [0] * len(nodes)
+        arcs = dict()
+        order = 0
+
+        while queue:
+            p, v = heapq.heappop(queue)
+            if contracted[v] or p != priorities[v]:  # przestarzały wpis
+                continue
+
+            for u, arc in in_adj[v].items():
+                arcs[(u, v)] = arc
+            for x, arc in out_adj[v].items():
+                arcs[(v, x)] = arc
+
+            for u, x, w in shortcuts(v):
+                if x not in out_adj[u] or w < out_adj[u][x][0]:
+                    out_adj[u][x] = (w, v, -1)
+                    in_adj[x][u] = (w, v, -1)
+
+            neighbors = set(in_adj[v]) | set(out_adj[v])
+            for u in in_adj[v]:
+                del out_adj[u][v]
+            for x in out_adj[v]:
+                del in_adj[x][v]
+            in_adj[v] = dict()
+            out_adj[v] = dict()
+            contracted[v] = True
+            rank[v] = order
+            order += 1
+
+            # po kontrakcji zmieniają się priorytety tylko sąsiadów
+            for u in neighbors:
+                deleted[u] += 1
+                priorities[u] = priority(u)
+                heapq.heappush(queue, (priorities[u], u))
+
+        return cls(graph, cost, rank, arcs)
+
+    # Zapis hierarchii na dysk (plik .npz); krawędzie oryginalne zapisywane są jako pozycje z graph_edges
+    def save(self, path: str):
+        keys = list(self.arcs.keys())
+        values = [self.arcs[key] for key in keys]
+        np.savez(path,
+                 cost=np.array(self.cost),
+                 node_count=np.array(len(self.nodes)),
+                 edge_count=np.array(len(self.edges)),
+                 rank=np.array(self.rank, dtype=np.int64),
+                 arc_from=np.array([u for u, _ in keys], dtype=np.int64),
+                 arc_to=np.array([v for _, v in keys], dtype=np.int64),
+                 arc_cost=np.array([w for w, _, _ in values], dtype=np.float64),
+                 arc_middle=np.array([m for _, m, _ in values], dtype=np.int64),
+                 arc_edge=np.array([e for _, _, e in values], dtype=np.int64))
+
+    # Odczyt hierarchii zapisanej dla tego samego grafu
+    @classmethod
+    def load(cls, path: str, graph):
+        with np.load(path) as data:
+            edge_count = sum(len(node.edges_out) for node in graph.nodes.values())
+            if int(data['node_count']) != len(graph.nodes) or int(data['edge_count']) != edge_count:
+                raise ValueError(f"Hierarchia {path} nie pasuje do grafu.")
+            arcs = {(u, v): (w, m, e) for u, v, w, m, e in zip(data['arc_from'].tolist(), data['arc_to'].tolist(),
+                                                                data['arc_cost'].tolist(), data['arc_middle'].tolist(),
+                                                                data['arc_edge'].tolist())}
+            return cls(graph, str(data['cost']), data['rank'].tolist(), arcs)
+
+    # Rozwinięcie łuku hierarchii (być może skrótu) do krawędzi grafu
+    def _unpack(self, u: int, v: int, used_edges: list):
+        stack = [(u, v)]
+        while stack:
+            u, v = stack.pop()
+            _, middle, e = self.arcs[(u, v)]
+            if middle == -1:
+                used_edges.append(self.edges[e])
+            else:
+                stack.append((middle, v))
+                stack.append((u, middle))
+
+    # Dwukierunkowe zapytanie CH; zwraca (ścieżka, użyte krawędzie) tak jak Graph.astar
+    def query(self, a, b):
+        self._check()
+        s = self.index[a]
+        t = self.index[b]
+        if s == t:
+            return [a], []
+
+        dist = ({s: 0}, {t: 0})
+        prev = ({}, {})  # poprzednik w danym kierunku wyszukiwania
+        queues = ([(0, s)], [(0, t)])
+        settled = (set(), set())
+        up = (self.up_out, self.up_in)
+        best = float('inf')
+        meeting = None
+
+        while queues[0] or queues[1]:
+            # rozwijamy kierunek z mniejszym kluczem na szczycie kolejki
+            if not queues[1] or (queues[0] and queues[0][0][0] <= queues[1][0][0]):
+                side = 0
+            else:
+                side = 1
+            d, u = heapq.heappop(queues[side])
+            if u in settled[side]:
+                continue
+            if d >= best:  # ten kierunek nie poprawi już wyniku
+                queues[side].clear()
+                continue
+            settled[side].add(u)
+
+            if u in dist[1 - side] and d + dist[1 - side][u] < best:
+                best = d + dist[1 - side][u]
+                meeting = u
+
+            for v, w in up[side][u]:
+                new_d = d + w
+                if new_d < dist[side].get(v, float('inf')):
+                    dist[side][v] = new_d
+                    prev[side][v] = u
+                    heapq.heappush(queues[side], (new_d, v))
+
+        if meeting is None:
+            return None, []
+
+        forward = [meeting]
+        while forward[-1] != s:
+            forward.append(prev[0][forward[-1]])
+        forward.reverse()
+        backward = [meeting]
+        while backward[-1] != t:
+            backward.append(prev[1][backward[-1]])
+        chain = forward + backward[1:]
+
+        used_edges = []
+        for u, v in zip(chain, chain[1:]):
+            self._unpack(u, v, used_edges)
+        path = [a] + [self.graph.nodes[edge.id_to] for edge in used_edges]
+        return path, used_edges
+
+    # Wyszukiwanie w górę hierarchii od węzła (indeksu) do wyczerpania kolejki; słownik węzeł -> koszt
+    def _upward(self, source: int, up: list) -> dict:
+        dist = {source: 0}
+        queue = [(0, source)]
+        while queue:
+            d, u = heapq.heappop(queue)
+            if d > dist[u]:
+                continue
+            for v, w in up[u]:
+                if d + w < dist.get(v, float('inf')):
+                    dist[v] = d + w
+                    heapq.heappush(queue, (d + w, v))
+        return dist
+
+    # Macierz kosztów wiele-do-wielu metodą kubełków: wyszukiwanie wstecz z każdego celu zapisuje
+    # (cel, koszt) w kubełkach odwiedzonych węzłów, a wyszukiwanie w przód ze źródła łączy się
+    # z kubełkami. Koszt to |S| + |T| małych wyszukiwań zamiast |S| x |T| zapytań.
+    def many_to_many(self, sources: list, targets: list) -> np.ndarray:
+        self._check()
+        buckets = dict()  # węzeł -> [(numer celu, koszt od węzła do celu)]
+        for j, target in enumerate(targets):
+            for v, d in self._upward(self.index[target], self.up_in).items():
+                buckets.setdefault(v, []).append((j, d))
+
+        matrix = np.full((len(sources), len(targets)), np.inf)
+        for i, source in enumerate(sources):
+            row = matrix[i]
+            for v, d in self._upward(self.index[source], self.up_out).items():
+                for j, d_t in buckets.get(v, ()):
+                    if d + d_t < row[j]:
+                        row[j] = d + d_t
+        return matrix
@@ -1,31 +1,35 @@
 import heapq
+import math
+import operator
+import threading
+import time
+import weakref
 import numpy as np
 
-def node_exists(id_list:list, nodes_dict:dict):
-    for id in id_list:
-        if id in nodes_dict:
-            return id
-    return False
-
-def add_node(id_list:list, nodes_dict:dict, node):
-    for id in id_list:
-        nodes_dict[id] = node
-
-def generate_4_ids(coords:tuple) -> list[tuple]:
-    (x, y) = coords
-    return [(x,y), (x+1, y+1), (x+1, y),(x, y+1)]
+from alternatives import penalty_alternatives, yen_alternatives
+from isochrone import isochrone
+from pqueue import BinaryHeap
+from search_stats import SearchStats
+from snapping import SnapIndex
+from spatial import SpatialIndex
 
+# Odtworzenie ścieżki z mapy poprzedników: prev[węzeł] = (poprzedni węzeł, krawędź prowadząca do węzła)
 def retrieve_path(prev, a, b):
     path = [b]
-    while b != a:
-        b = prev[b]  
+    used_edges = []
+    while b is not a:
+        b, edge = prev[b]
         path.append(b)
+        used_edges.append(edge)
     path.reverse()  
-    return path
+    used_edges.reverse()
+    return path, used_edges
 
 #Klasa reprezentująca krawędź grafu
 class Edge:
-    def __init__(self, id: int, id_from: tuple, id_to: tuple, id_road: int, length: float, time_cost: float, oneway: int):
+    def __init__(self, id: int, id_from: tuple, id_to: tuple, id_road: int, length: float, time_cost: float, oneway: int,
+                 kat_zarzad: str = None, klasa_drog: str = None, fids: list = None, bearings: tuple = None,
+                 shares: list = None):
         self.id = id  
         self.id_from = id_from  
         self.id_to = id_to 
@@ -33,183 +37,536 @@ class Edge:
         self.length = length  
         self.time_cost = time_cost  
         self.oneway = oneway 
+        self.kat_zarzad = kat_zarzad  # atrybuty drogi używane przez profile kosztów
+        self.klasa_drog = klasa_drog
+        self.index = None  # pozycja w Graph.edges (nadawana przy dodaniu do grafu)
+        self.fids = fids or [id]  # obiekty warstwy źródłowej w kolejności jazdy (kilka po simplify.simplify_roads)
+        self.shares = shares or [1.0] * len(self.fids)  # udział odcinków fids w czasie przejazdu krawędzi
+        # kierunki (radiany) geometrii na początku i końcu krawędzi zgodnie z kierunkiem krawędzi - do skrętów
+        # w turns.TurnModel; None (albo nan) - brak geometrii, używana jest cięciwa id_from -> id_to
+        self.bearings = bearings
+
+    # Krawędź o przeciwnym kierunku z tymi samymi atrybutami
+    def reversed(self, oneway: int):
+        bearings = None
+        if self.bearings is not None:
+            start, end = self.bearings
+            bearings = (end + math.pi, start + math.pi)
+        return Edge(self.id, self.id_to, self.id_from, self.id_road, self.length, self.time_cost, oneway,
+                    self.kat_zarzad, self.klasa_drog, self.fids[::-1], bearings, self.shares[::-1])
 
 #Klasa reprezentująca graf
 class Graph:
-    def __init__(self):
-        self.nodes = dict()  # klucze to identyfikatory węzłów, wartości to obiekty klasy Node
+    def __init__(self, tolerance: float = 1):
+        self.nodes = dict()  # klucze to współrzędne węzłów, wartości to obiekty klasy Node (każdy węzeł raz)
+        self.snap_index = SnapIndex(tolerance)  # przyciąganie końców krawędzi do istniejących węzłów
+        self.edges = []  # wszystkie krawędzie skierowane, pozycja na liście to edge.index
+        self.profiles = dict()  # nazwa profilu -> profiles.CostProfile
+        self.costs = dict()  # nazwa profilu -> tablica kosztów krawędzi według edge.index
+        self._cost_lists = dict()  # te same koszty jako listy - szybszy odczyt w pętlach wyszukiwania
+        self.version = 0  # zwiększana przy każdej zmianie kosztów krawędzi
+        self.listeners = []  # listener(graph, id_road) wywoływane po zmianie kosztów drogi (zob. add_listener)
+        # id_road -> (mnożnik czasu przejazdu, czas wygaśnięcia lub None); słownik jest podmieniany, a nie
+        # zmieniany w miejscu, więc wyszukiwania mogą go przeglądać w trakcie zmian z innego wątku
+        self.overrides = dict()
+        self._road_edges = dict()  # id_road (także FID odcinka scalonej krawędzi) -> krawędzie; None - do zbudowania
+        self._snap_ratio = None  # wynik snap_ratio(); None - do policzenia
+        self._base_time_cost = dict()  # edge.index -> time_cost sprzed zmiany
+        self._expiry = []  # kolejka (czas wygaśnięcia, id_road) zmian ograniczonych w czasie
+        self._timer = None  # threading.Timer wygaszający najbliższą zmianę z _expiry
+        self._lock = threading.RLock()  # zmiany kosztów (update_road, clear_road, wygasanie); wyszukiwania go nie biorą
+        self.queue = BinaryHeap  # kolejka wyszukiwań: pqueue.BinaryHeap albo pqueue.IndexedHeap (zmniejszanie klucza)
+
+    # Funkcja zwracająca węzeł, do którego przyciągany jest punkt (None, jeśli takiego nie ma)
+    def get_node(self, coords: tuple):
+        return self.snap_index.find(coords)
+
+    # Funkcja zwracająca istniejący węzeł dla punktu albo tworząca nowy
+    def snap_node(self, coords: tuple):
+        node = self.snap_index.find(coords)
+        if node is None:
+            node = self.add_node(coords)
+        return node
+
+    # Dodanie nowego węzła (bez przyciągania); węzeł dostaje kolejny numer Node.index
+    def add_node(self, coords: tuple):
+        node = Node(*coords)
+        node.index = len(self.nodes)
+        self.nodes[coords] = node
+        self.snap_index.insert(coords, node)
+        return node
 
     # Funkcja dodająca krawędź do grafu
     def add_edge(self, edge: Edge):
-        ids_from = generate_4_ids(edge.id_from)
-        ids_to = generate_4_ids(edge.id_to)
-
-        if not node_exists(ids_from, self.nodes) and not node_exists(ids_to, self.nodes):  # oba wierzcholki krawedzi nie znajduja sie w grafie
-            starting_node = Node(*edge.id_from)
-            ending_node = Node(*edge.id_to)
-
-            add_node(ids_from, self.nodes, starting_node)
-            add_node(ids_to, self.nodes, ending_node)
-            
-        elif node_exists(ids_from, self.nodes) and not node_exists(ids_to, self.nodes):  # tylko wierzcholek poczatkowy jest w grafie
-            starting_node = self.nodes[node_exists(ids_from, self.nodes)]  
-            ending_node = Node(*edge.id_to)
-            
-            add_node(ids_to, self.nodes, ending_node)
-            
-        elif node_exists(ids_to, self.nodes) and not node_exists(ids_from, self.nodes):  # tylko wierzcholek koncowy jest w grafie
-            ending_node = self.nodes[node_exists(ids_to, self.nodes)]
-            starting_node = Node(*edge.id_from)
-            
-            add_node(ids_from, self.nodes, starting_node)
-
-        else:  # oba wierzchołki są już w grafie
-            starting_node = self.nodes[node_exists(ids_from, self.nodes)]
-            ending_node = self.nodes[node_exists(ids_to, self.nodes)]
+        starting_node = self.snap_node(edge.id_from)
+        ending_node = self.snap_node(edge.id_to)
+
+        # Krawędź wskazuje na kanoniczne współrzędne węzłów, więc wyszukiwanie sąsiada to jedno odwołanie do słownika
+        edge.id_from = (starting_node.x, starting_node.y)
+        edge.id_to = (ending_node.x, ending_node.y)
 
        # Uwzględniamy kierunkowść
         if edge.oneway == 0:  # Dwukierunkowa
-            starting_node.add_edge(edge)  # from -> to
-            backwards_edge = Edge(edge.id, edge.id_to, edge.id_from, edge.id_road, edge.length, edge.time_cost, oneway=0)
-            ending_node.add_edge(backwards_edge)  # to -> from
+            self._connect(starting_node, ending_node, edge)  # from -> to
+            backwards_edge = edge.reversed(oneway=0)
+            self._connect(ending_node, starting_node, backwards_edge)  # to -> from
         elif edge.oneway == 1:  # Jednokierunkowa zgodnie z geometria
-            starting_node.add_edge(edge)
+            self._connect(starting_node, ending_node, edge)
         elif edge.oneway == 2:  # Jednokierunkowa w przeciwnym kierunku
-            backwards_edge = Edge(edge.id, edge.id_to, edge.id_from, edge.id_road, edge.length, edge.time_cost, oneway=2)
-            ending_node.add_edge(backwards_edge)
-
-    def reset_nodes(self):
-        for node in self.nodes.values():
-            node.h = None
-            node.g = float('inf')
-            node.f = float('inf')
-
-    # Algorytm A* do wyszukiwania najszybszej trasy
-    def astar_fastest(self, a, b):
-        queue = []
-        heapq.heappush(queue, (0, a))  
-        a.g = 0  
-        a.f = a.heuristic_time(b)  
-        visited = set()  
-        prev = {}  
-        prev[a] = None
+            backwards_edge = edge.reversed(oneway=2)
+            self._connect(ending_node, starting_node, backwards_edge)
+
+    # Dodanie krawędzi skierowanej do listy wychodzących i (odwrotnej) listy wchodzących
+    def _connect(self, starting_node, ending_node, edge: Edge):
+        edge.index = len(self.edges)
+        self.edges.append(edge)
+        self._snap_ratio = None
+        if self._road_edges is not None:
+            self._add_road_edges(self._road_edges, (edge,))
+        starting_node.add_edge(edge)
+        ending_node.edges_in.append(edge)
+
+    # Krawędzie według dróg (do update_road); graf odtworzony ze zrzutu buduje je dopiero przy pierwszej zmianie
+    def _roads(self) -> dict:
+        road_edges = self._road_edges
+        if road_edges is None:
+            road_edges = dict()
+            self._add_road_edges(road_edges, self.edges)
+            self._road_edges = road_edges  # przypisanie po zbudowaniu - inny wątek nie widzi niepełnego indeksu
+        return road_edges
+
+    # Zapis krawędzi pod id_road i FID-ami odcinków krawędzi scalonej
+    @staticmethod
+    def _add_road_edges(road_edges: dict, edges):
+        for edge in edges:
+            road_edges.setdefault(edge.id_road, []).append(edge)
+            if len(edge.fids) > 1 or edge.fids[0] != edge.id_road:
+                for id_road in edge.fids:
+                    if id_road != edge.id_road:
+                        road_edges.setdefault(id_road, []).append(edge)
+
+    # Wyliczenie kosztów profilu dla wszystkich krawędzi naraz; profil wybiera się potem po nazwie
+    # (np. graph.astar_fastest(a, b, profile='truck')). Po dodaniu krawędzi profil trzeba dodać ponownie.
+    # Zmiana istniejącego profilu powiadamia słuchaczy tak jak update_road (id_road=None - wszystkie drogi).
+    def add_profile(self, profile):
+        costs = profile.evaluate([edge.length for edge in self.edges],
+                                 np.array([edge.kat_zarzad for edge in self.edges], dtype=object),
+                                 np.array([edge.klasa_drog for edge in self.edges], dtype=object))
+        with self._lock:
+            redefined = profile.name in self.profiles
+            self.profiles[profile.name] = profile
+            self.costs[profile.name] = costs  # koszty bez zmian z update_road
+            self._cost_lists[profile.name] = costs.tolist()
+            for id_road in self.overrides:
+                self._apply(id_road)
+            if redefined:
+                self._changed(None)
+
+    # Przeliczenie kosztu czasu wszystkich krawędzi drogi (oba kierunki) z aktywnych zmian. Krawędź scalona
+    # (simplify.simplify_roads) należy do kilku dróg - mnożnik odcinka zmienia tylko jego udział w czasie
+    # przejazdu (Edge.shares), zamknięcie dowolnego odcinka zamyka całą krawędź, a koszt pierwotny wraca
+    # dopiero, gdy żadna z tych dróg nie ma zmiany.
+    def _apply(self, id_road: int):
+        overrides = self.overrides
+        for edge in self._roads()[id_road]:
+            factors = [overrides[road][0] if road in overrides else 1 for road in edge.fids]
+            if edge.id_road in overrides and edge.id_road not in edge.fids:  # droga krawędzi spoza fids
+                factors = [max(factor, overrides[edge.id_road][0]) for factor in factors]
+            active = any(road in overrides for road in [edge.id_road] + edge.fids)
+            if any(math.isinf(factor) for factor in factors):
+                factor = math.inf
+            else:
+                factor = sum(share * segment for share, segment in zip(edge.shares, factors))
+            base = self._base_time_cost.setdefault(edge.index, edge.time_cost)
+            edge.time_cost = math.inf if math.isinf(factor) else base * factor
+            for name, costs in self.costs.items():
+                self._cost_lists[name][edge.index] = math.inf if math.isinf(factor) else costs[edge.index] * factor
+            if not active:
+                del self._base_time_cost[edge.index]
+
+    # Rejestracja słuchacza zmian kosztów. Metody obiektów (heurystyki, hierarchie, pamięć podręczna tras)
+    # zapisywane są przez weakref.WeakMethod, więc graf nie utrzymuje porzuconych obiektów przy życiu,
+    # a ich martwe odwołania są usuwane przy kolejnej rejestracji i zmianie kosztów
+    def add_listener(self, listener):
+        self._prune_listeners()
+        self.listeners.append(weakref.WeakMethod(listener) if hasattr(listener, '__self__') else listener)
+
+    def remove_listener(self, listener):
+        self.listeners = [entry for entry in self.listeners
+                          if (entry() if isinstance(entry, weakref.WeakMethod) else entry) != listener]
+
+    def _prune_listeners(self):
+        self.listeners = [entry for entry in self.listeners
+                          if not isinstance(entry, weakref.WeakMethod) or entry() is not None]
+
+    def _changed(self, id_road: int):
+        self.version += 1
+        for entry in list(self.listeners):
+            listener = entry() if isinstance(entry, weakref.WeakMethod) else entry
+            if listener is not None:
+                listener(self, id_road)
+        self._prune_listeners()
+
+    # Zmiana kosztu drogi id_road bez przebudowy grafu: czas przejazdu (time_cost i profile) obu kierunków
+    # mnożony jest przez factor względem wartości pierwotnej (factor=inf - zamknięcie drogi, także dla 'length').
+    # Z duration (s) zmiana wygasa samoczynnie. Wszystkie krawędzie drogi zmieniane są przed powiadomieniem
+    # słuchaczy (heurystyki, hierarchie, pamięć podręczna tras), więc nie widzą one stanu pośredniego.
+    # W grafie uproszczonym (simplify.simplify_roads) id_road może być FID dowolnego odcinka scalonej krawędzi -
+    # mnożnik zmienia wtedy tylko udział tego odcinka w czasie przejazdu krawędzi (zamknięcie - całą krawędź).
+    def update_road(self, id_road: int, factor: float, duration: float = None):
+        if id_road not in self._roads():
+            raise ValueError(f"Brak drogi {id_road} w grafie.")
+        if not factor > 0:
+            raise ValueError(f"Mnożnik kosztu musi być dodatni, podano {factor}.")
+        with self._lock:
+            self.expire_overrides()
+            expires = None if duration is None else time.time() + duration
+            overrides = dict(self.overrides)
+            if factor == 1 and expires is None:
+                overrides.pop(id_road, None)
+            else:
+                overrides[id_road] = (factor, expires)
+            self.overrides = overrides
+            self._apply(id_road)
+            if expires is not None:
+                heapq.heappush(self._expiry, (expires, id_road))
+                self._schedule_expiry()
+            self._changed(id_road)
+
+    # Przywrócenie pierwotnego kosztu drogi
+    def clear_road(self, id_road: int):
+        with self._lock:
+            if id_road in self.overrides:
+                self.overrides = {road: value for road, value in self.overrides.items() if road != id_road}
+                self._apply(id_road)
+                self._changed(id_road)
+
+    # Wycofanie zmian, których czas minął. Wywoływane po stronie zapisu - przez update_road i wątek
+    # Graph._timer uruchamiany na czas najbliższego wygaśnięcia - więc wyszukiwania tylko czytają graf
+    def expire_overrides(self, now: float = None):
+        with self._lock:
+            now = time.time() if now is None else now
+            while self._expiry and self._expiry[0][0] <= now:
+                expires, id_road = heapq.heappop(self._expiry)
+                if self.overrides.get(id_road, (None, None))[1] == expires:  # zmiana nie została w międzyczasie zastąpiona
+                    self.clear_road(id_road)
+            self._schedule_expiry()
+
+    def _schedule_expiry(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._expiry:
+            self._timer = threading.Timer(max(self._expiry[0][0] - time.time(), 0), _expire, (weakref.ref(self),))
+            self._timer.daemon = True
+            self._timer.start()
+
+    # Najmniejszy aktywny mnożnik czasu (<= 1) - heurystyki czasu skalowane są przez niego, żeby
+    # po przyspieszeniu dróg nadal nie przeszacowywać kosztu
+    def speedup(self) -> float:
+        return min([1] + [factor for factor, _ in self.overrides.values()])
+
+    # Funkcja zwracająca koszt krawędzi dla metryki: 'length', 'time_cost', nazwy profilu
+    # albo funkcji edge -> koszt (np. nakładki kosztów tylko dla jednego zapytania)
+    def edge_weight(self, cost):
+        if callable(cost):
+            return cost
+        if cost in self._cost_lists:
+            costs = self._cost_lists[cost]
+            return lambda edge: costs[edge.index]
+        if cost not in ('length', 'time_cost'):
+            raise ValueError(f"Nieznana metryka lub profil {cost}.")
+        closed = {edge.index for id_road, (factor, _) in self.overrides.items() if math.isinf(factor)
+                  for edge in self._roads()[id_road]}
+        if cost == 'length' and closed:
+            return lambda edge: math.inf if edge.index in closed else edge.length
+        return operator.attrgetter(cost)
+
+    # Domyślna heurystyka dla metryki; dla profilu - odległość przy jego największej prędkości
+    def default_heuristic(self, cost: str):
+        if cost == 'length':
+            return Node.heuristic_length
+        speedup = self.speedup()
+        if cost == 'time_cost':
+            return Node.heuristic_time if speedup == 1 else lambda node, goal: node.heuristic_time(goal) * speedup
+        speed = self.profiles[cost].top_speed / speedup
+        return lambda node, goal: node.heuristic_length(goal) / speed
+
+    # Najmniejszy stosunek długości krawędzi do odległości w linii prostej między jej węzłami (najwyżej 1).
+    # Końce krawędzi przyciągane są do węzłów w granicach tolerancji, więc krawędź może być krótsza niż
+    # odcinek między węzłami i heurystyka odległości nie jest spójna. Przemnożona przez ten stosunek - jest.
+    def snap_ratio(self) -> float:
+        if self._snap_ratio is None:
+            ratio = 1
+            for edge in self.edges:
+                distance = math.dist(edge.id_from, edge.id_to)
+                if edge.length < distance * ratio:
+                    ratio = edge.length / distance
+            self._snap_ratio = ratio
+        return self._snap_ratio
+
+    # Wspólna pętla A*. Stan wyszukiwania (g, prev, visited) jest lokalny dla zapytania,
+    # więc graf nie jest modyfikowany i wiele zapytań może działać na nim jednocześnie
+    def _astar(self, a, b, cost: str, heuristic, stats: SearchStats = None):
+        if getattr(heuristic, 'cost', cost) != cost:
+            raise ValueError(f"Heurystyka dla metryki {heuristic.cost} nie pasuje do metryki {cost}.")
+        track = stats is not None
+        if track:
+            stats.start()
+        heap_max = 0
+        weight = self.edge_weight(cost)
+        queue = self.queue([(heuristic(a, b), a.index, a)])  # remisy rozstrzyga Node.index (pqueue)
+        push, pop = queue.push, queue.pop
+        pushes = 1
+        g = {a: 0}  # najlepszy znany koszt dotarcia do węzła
+        visited = set()
+        prev = {}  # poprzednik i krawędź, którą dotarliśmy do węzła
         used_edges = []
 
         while queue:
-            _, u = heapq.heappop(queue)  # Pobieramy węzeł z najniższym `f=g+h(przyblizony koszt dotarcia do wezla poczartkowego)`z kolejki
+            if track and len(queue) > heap_max:
+                heap_max = len(queue)
+            _, _, u = pop()  # Pobieramy węzeł z najniższym `f=g+h(przyblizony koszt dotarcia do wezla poczartkowego)`z kolejki
             if u in visited:
                 continue
 
-            if u.x == b.x and u.y == b.y:
-                path = retrieve_path(prev, a, b)
-                used_edges = self.get_used_edges(path)
-                return path, used_edges
+            if u is b:
+                if track:
+                    stats.finish(pushes, len(queue), len(visited) + 1, heap_max, decreases=queue.decreases)
+                return retrieve_path(prev, a, b)
             visited.add(u)
+
+            # - dla każdego sąsiada bieżącego węzła:
             for edge in u.edges_out:
-                neighbor = self.nodes.get(node_exists(generate_4_ids(edge.id_to), self.nodes))
+                neighbor = self.nodes[edge.id_to]
                 if neighbor in visited:
                     continue
 
-                new_neighbor_g = u.g + edge.time_cost
-
-                if new_neighbor_g < neighbor.g:
-                    # Aktualizujemy koszt g i f sąsiada, jeśli znaleźliśmy lepszą trasę
-                    prev[neighbor] = u
-                    neighbor.g = new_neighbor_g
-                    neighbor.f = neighbor.g + neighbor.heuristic_time(b)
-                    heapq.heappush(queue, (neighbor.f, neighbor))
-
-        return None, used_edges  
-
-    def astar(self, a, b):
+                new_neighbor_g = g[u] + weight(edge)
 
-        queue = []
-        heapq.heappush(queue, (0, a))
+                if new_neighbor_g < g.get(neighbor, float('inf')):
+                    # Aktualizujemy koszt g sąsiada, jeśli znaleźliśmy lepszą trasę
+                    prev[neighbor] = (u, edge)
+                    g[neighbor] = new_neighbor_g
+                    push((new_neighbor_g + heuristic(neighbor, b), neighbor.index, neighbor))
+                    pushes += 1
 
-        a.g = 0
-        a.f = a.heuristic_length(b)
-
-        visited = set()
-        prev = {} 
-        prev[a] = None
-        used_edges = []
+        if track:
+            stats.finish(pushes, len(queue), len(visited), heap_max, decreases=queue.decreases)
+        return None, used_edges
 
-        while queue:
-            _, u = heapq.heappop(queue)
-            if u in visited:
+    # Dwukierunkowe A*: w przód po edges_out od a i wstecz po edges_in od b, z potencjałem
+    # p(v) = (h(v, b) - h(a, v)) / 2, dzięki któremu oba kierunki widzą te same zredukowane koszty.
+    # Wyszukiwanie kończy się, gdy suma kluczy na szczytach obu kolejek osiągnie koszt najlepszej trasy.
+    # Warunek daje trasę najkrótszą tylko dla spójnej heurystyki (h(u, t) <= w(u, v) + h(v, t)), dlatego
+    # heurystyka skalowana jest przez snap_ratio(), chyba że ma atrybut consistent (np. LandmarkHeuristic).
+    # Bez heurystyki (heuristic=None) jest to dwukierunkowy Dijkstra.
+    def _bidirectional(self, a, b, cost: str, heuristic=None, stats: SearchStats = None):
+        if getattr(heuristic, 'cost', cost) != cost:
+            raise ValueError(f"Heurystyka dla metryki {heuristic.cost} nie pasuje do metryki {cost}.")
+        track = stats is not None
+        if track:
+            stats.start()
+        heap_max = 0
+        if a is b:
+            if track:
+                stats.finish(0, 0, 0, 0, initial=0)
+            return [a], [], 0
+
+        scale = 0.5 if getattr(heuristic, 'consistent', False) else self.snap_ratio() / 2
+
+        def potential(v):
+            if heuristic is None:
+                return 0
+            return (heuristic(v, b) - heuristic(a, v)) * scale
+
+        weight = self.edge_weight(cost)
+        queues = (self.queue([(potential(a), a.index, a)]), self.queue([(-potential(b), b.index, b)]))
+        pushers, poppers = (queues[0].push, queues[1].push), (queues[0].pop, queues[1].pop)
+        pushes = 2
+        distances = ({a: 0}, {b: 0})
+        prev = ({}, {})  # w przód: poprzednik i krawędź; wstecz: następnik i krawędź
+        settled = (set(), set())
+        best = float('inf')
+        meeting = None
+
+        while queues[0] and queues[1]:
+            if queues[0][0][0] + queues[1][0][0] >= best:
+                break
+            if track and len(queues[0]) + len(queues[1]) > heap_max:
+                heap_max = len(queues[0]) + len(queues[1])
+            side = 0 if queues[0][0][0] <= queues[1][0][0] else 1
+            _, _, u = poppers[side]()
+            if u in settled[side]:
                 continue
+            settled[side].add(u)
 
-            if u.x == b.x and u.y == b.y:
-                path = retrieve_path(prev, a, b)
-                used_edges = self.get_used_edges(path)
-                return path, used_edges
-            visited.add(u)
-
-            # - dla każdego sąsiada bieżącego węzła:
-            for edge in u.edges_out:
-                neigbour = self.nodes.get(node_exists(generate_4_ids(edge.id_to), self.nodes))
-
-                if neigbour in visited:
+            for edge in (u.edges_out if side == 0 else u.edges_in):
+                neighbor = self.nodes[edge.id_to] if side == 0 else self.nodes[edge.id_from]
+                if neighbor in settled[side]:
                     continue
-
-                new_neigbour_g = u.g + edge.length
-
-                if new_neigbour_g < neigbour.g:
-                    prev[neigbour] = u
-                    neigbour.g = new_neigbour_g
-                    neigbour.f = neigbour.g + neigbour.heuristic_length(b)
-                    heapq.heappush(queue, (neigbour.f, neigbour))
-
-        return None, used_edges
+                distance = distances[side][u] + weight(edge)
+
+                if distance < distances[side].get(neighbor, float('inf')):
+                    distances[side][neighbor] = distance
+                    prev[side][neighbor] = (u, edge)
+                    key = distance + potential(neighbor) if side == 0 else distance - potential(neighbor)
+                    pushers[side]((key, neighbor.index, neighbor))
+                    pushes += 1
+
+                    if neighbor in distances[1 - side] and distance + distances[1 - side][neighbor] < best:
+                        best = distance + distances[1 - side][neighbor]
+                        meeting = neighbor
+
+        if track:
+            stats.finish(pushes, len(queues[0]) + len(queues[1]), len(settled[0]) + len(settled[1]),
+                         heap_max, initial=2, decreases=queues[0].decreases + queues[1].decreases)
+        if meeting is None:
+            return None, [], float('inf')
+
+        path, used_edges = retrieve_path(prev[0], a, meeting)
+        node = meeting
+        while node is not b:
+            node, edge = prev[1][node]
+            path.append(node)
+            used_edges.append(edge)
+        return path, used_edges, best
+
+    # Algorytm A* do wyszukiwania najszybszej trasy; heuristic to np. heuristics.LandmarkHeuristic
+    # (domyślnie odległość w linii prostej przy prędkości maksymalnej)
+    # profile to nazwa profilu dodanego przez add_profile (domyślnie koszt time_cost krawędzi)
+    # Przekazany obiekt search_stats.SearchStats zbiera liczniki wyszukiwania (bez niego pętla nic nie liczy)
+    def astar_fastest(self, a, b, heuristic=None, bidirectional: bool = False, profile: str = None,
+                      stats: SearchStats = None):
+        cost = profile or 'time_cost'
+        if bidirectional:
+            path, used_edges, _ = self._bidirectional(a, b, cost, heuristic or self.default_heuristic(cost), stats)
+            return path, used_edges
+        return self._astar(a, b, cost, heuristic or self.default_heuristic(cost), stats)
+
+    def astar(self, a, b, heuristic=None, bidirectional: bool = False, stats: SearchStats = None):
+        if bidirectional:
+            path, used_edges, _ = self._bidirectional(a, b, 'length', heuristic or Node.heuristic_length, stats)
+            return path, used_edges
+        return self._astar(a, b, 'length', heuristic or Node.heuristic_length, stats)
     
-    def dijkstra(self, a, b):
-
-        queue = []  
-        heapq.heappush(queue, (0, a)) 
-        distances = {node: float('inf') for node in self.nodes.values()}  
-        distances[a] = 0  
-        prev = {node: None for node in self.nodes.values()}  
+    # Kilka tras między a i b w jednym wywołaniu: method='penalty' (kary za drogi użyte przez poprzednie
+    # trasy) albo 'yen' (k najkrótszych tras bez pętli). Zwraca listę alternatives.Route z kosztem
+    # i udziałem długości wspólnej z wcześniejszymi trasami; graf nie jest modyfikowany.
+    def alternatives(self, a, b, k: int = 3, method: str = 'penalty', cost: str = 'time_cost', **options):
+        if method == 'penalty':
+            return penalty_alternatives(self, a, b, k, cost, **options)
+        if method == 'yen':
+            return yen_alternatives(self, a, b, k, cost, **options)
+        raise ValueError(f"Nieznana metoda wyznaczania tras alternatywnych {method}.")
+
+    # Obszar osiągalny z węzła a w budżecie kosztu (dla 'time_cost' w sekundach): osiągnięte węzły,
+    # krawędzie pełne i częściowe, linie i wielokąt; isochrone.Isochrone.used_edges() można zapisać przez save_shp
+    def isochrone(self, a, budget: float, cost: str = 'time_cost'):
+        return isochrone(self, a, budget, cost)
+
+    # Dijkstra z leniwą inicjalizacją - słowniki zawierają tylko węzły osiągnięte przez zapytanie,
+    # przestarzałe wpisy kolejki są pomijane, a wyszukiwanie kończy się po ustaleniu wszystkich celów
+    # (targets=None oznacza przeszukanie całego osiągalnego grafu)
+    def _dijkstra(self, a, targets, cost: str, stats: SearchStats = None):
+        track = stats is not None
+        if track:
+            stats.start()
+        heap_max = 0
+        weight = self.edge_weight(cost)
+        queue = self.queue([(0, a.index, a)])
+        push, pop = queue.push, queue.pop
+        pushes = 1
+        distances = {a: 0}
+        prev = {}  # poprzednik i krawędź, którą dotarliśmy do węzła
+        settled = set()
+        remaining = set(targets) if targets is not None else None
 
         while queue:
-            current_distance, current_node = heapq.heappop(queue)
-            if current_node == b:
-                break
+            if track and len(queue) > heap_max:
+                heap_max = len(queue)
+            current_distance, _, current_node = pop()
+            if current_node in settled:  # przestarzały wpis - węzeł ma już ustaloną odległość
+                continue
+            settled.add(current_node)
+
+            if remaining is not None:
+                remaining.discard(current_node)
+                if not remaining:
+                    break
 
             for edge in current_node.edges_out:
-                neighbor = self.nodes[node_exists(generate_4_ids(edge.id_to), self.nodes)]
-                distance = current_distance + edge.length  
+                neighbor = self.nodes[edge.id_to]
+                if neighbor in settled:
+                    continue
+                distance = current_distance + weight(edge)
 
-                if distance < distances[neighbor]:
+                if distance < distances.get(neighbor, float('inf')):
                     distances[neighbor] = distance
-                    prev[neighbor] = current_node
-                    heapq.heappush(queue, (distance, neighbor))
-
-        path = []
-        used_edges = []
-        total_distance = distances[b]
-        current = b
-        while current is not None:
-            path.append(current)
-            prev_node = prev[current]
-            if prev_node:
-                for edge in prev_node.edges_out:
-                    if edge.id_to == tuple(map(int, current.id.split(','))):
-                        used_edges.append(edge)
-                        break
-            current = prev_node
-        path.reverse()  
-
-        return None, path, used_edges, total_distance
-
-    # Funkcja do uzyskania krawędzi użytych w ścieżce
-    def get_used_edges(self, path):
-        edges = []
-        for i in range(len(path) - 1):
-            for edge in path[i].edges_out:
-                if edge.id_to == tuple(map(int, path[i + 1].id.split(','))):
-                    edges.append(edge)
-                    break
-        return edges
+                    prev[neighbor] = (current_node, edge)
+                    push((distance, neighbor.index, neighbor))
+                    pushes += 1
+
+        if track:
+            stats.finish(pushes, len(queue), len(settled), heap_max, decreases=queue.decreases)
+        return distances, prev, settled
+
+    def dijkstra(self, a, b, bidirectional: bool = False, profile: str = None, stats: SearchStats = None):
+        cost = profile or 'length'
+        if bidirectional:
+            path, used_edges, total_distance = self._bidirectional(a, b, cost, stats=stats)
+            return None, path or [b], used_edges, total_distance
+
+        distances, prev, settled = self._dijkstra(a, [b], cost, stats)
+
+        if b not in settled:  # brak trasy
+            return None, [b], [], float('inf')
+        path, used_edges = retrieve_path(prev, a, b)
+
+        return None, path, used_edges, distances[b]
+
+    # Dijkstra jeden-do-wielu: słownik cel -> (ścieżka, użyte krawędzie, koszt); None dla nieosiągalnych celów.
+    # cost to 'length', 'time_cost' albo nazwa profilu
+    def dijkstra_many(self, a, targets: list, cost: str = 'length'):
+        distances, prev, settled = self._dijkstra(a, targets, cost)
+
+        results = dict()
+        for target in targets:
+            if target in settled:
+                path, used_edges = retrieve_path(prev, a, target)
+                results[target] = (path, used_edges, distances[target])
+            else:
+                results[target] = (None, [], float('inf'))
+        return results
+
+    # Macierz kosztów przejazdu (tablica źródła x cele) między punktami przyciąganymi do najbliższych węzłów.
+    # Z hierarchią (ch.ContractionHierarchy zbudowaną dla tej samej metryki) liczona metodą kubełków,
+    # bez niej - jednym wyszukiwaniem Dijkstry z każdego źródła do wszystkich celów. Brak trasy to inf.
+    def travel_matrix(self, sources: list, targets: list, cost: str = 'time_cost', hierarchy=None,
+                      index: SpatialIndex = None) -> np.ndarray:
+        index = index or SpatialIndex(self)
+        source_nodes = [index.nodes[i] for i in index.nearest(sources)[0].tolist()] if len(sources) else []
+        target_nodes = [index.nodes[i] for i in index.nearest(targets)[0].tolist()] if len(targets) else []
+
+        if hierarchy is not None:
+            if hierarchy.cost != cost:
+                raise ValueError(f"Hierarchia dla metryki {hierarchy.cost} nie pasuje do metryki {cost}.")
+            return hierarchy.many_to_many(source_nodes, target_nodes)
+
+        matrix = np.full((len(source_nodes), len(target_nodes)), np.inf)
+        rows = dict()  # to samo źródło przyciągnięte kilka razy liczone jest raz
+        for i, source in enumerate(source_nodes):
+            if source not in rows:
+                distances, _, settled = self._dijkstra(source, target_nodes, cost)
+                rows[source] = [distances[t] if t in settled else np.inf for t in target_nodes]
+            matrix[i] = rows[source]
+        return matrix
+
+# Wygaszenie zmian kosztów z wątku Graph._timer; słabe odwołanie nie utrzymuje porzuconego grafu przy życiu
+def _expire(graph_ref):
+    graph = graph_ref()
+    if graph is not None:
+        graph.expire_overrides()
 
 # Klasa reprezentująca wierzchołek grafu
 class Node:
@@ -217,19 +574,16 @@ class Node:
         self.x = x
         self.y = y
         self.id = f"{self.x},{self.y}"  
+        self.index = None  # numer węzła w grafie (nadawany przez Graph.add_node), rozstrzyga remisy w kolejkach
         self.edges_out = []  
-        self.h = None  
-        self.g = float('inf')  
-        self.f = float('inf')  
+        self.edges_in = []  # krawędzie wchodzące - do wyszukiwania wstecz
 
     def heuristic_time(self, goal):
         max_speed = 100 / 3.6
-        self.h = np.sqrt((goal.x - self.x) ** 2 + (goal.y - self.y) ** 2) / max_speed
-        return self.h
+        return np.sqrt((goal.x - self.x) ** 2 + (goal.y - self.y) ** 2) / max_speed
 
     def heuristic_length(self, goal):
-        self.h = np.sqrt((goal.x - self.x) ** 2 + (goal.y - self.y) ** 2)  
-        return self.h
+        return np.sqrt((goal.x - self.x) ** 2 + (goal.y - self.y) ** 2)
 
     def add_edge(self, edge: Edge):
         self.edges_out.append(edge)
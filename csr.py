@@ -0,0 +1,157 @@
+import heapq
+import math
+import numpy as np
+
+from snapping import SnapIndex
+
+MAX_SPEED = 100 / 3.6  # prędkość użyta w heurystyce czasu (m/s), jak w Node.heuristic_time
+
+# Zwarta reprezentacja grafu w formacie CSR (compressed sparse row).
+# Węzły to liczby całkowite 0..n-1, krawędzie wychodzące z węzła v zajmują
+# pozycje offsets[v]:offsets[v+1] w tablicach targets/length/time_cost/road_id/edge_id.
+class CSRGraph:
+    def __init__(self, x, y, offsets, targets, length, time_cost, road_id, edge_id):
+        self.x = x  # współrzędne węzłów
+        self.y = y
+        self.offsets = offsets
+        self.targets = targets
+        self.length = length
+        self.time_cost = time_cost
+        self.road_id = road_id
+        self.edge_id = edge_id  # FID obiektu w warstwie źródłowej
+
+    @property
+    def node_count(self):
+        return len(self.offsets) - 1
+
+    @property
+    def edge_count(self):
+        return len(self.targets)
+
+    # Budowa z list krawędzi (takich samych jak dla Graph.add_edge), bez tworzenia obiektów Node/Edge
+    @classmethod
+    def from_edges(cls, ids, starts, ends, road_ids, lengths, time_costs, oneways, tolerance: float = 1):
+        snap_index = SnapIndex(tolerance)
+        xs, ys = [], []
+
+        def snap(coords):
+            index = snap_index.find(coords)
+            if index is None:
+                index = len(xs)
+                xs.append(coords[0])
+                ys.append(coords[1])
+                snap_index.insert(coords, index)
+            return index
+
+        sources, targets, edge_rows = [], [], []
+        for row, (start, end, oneway) in enumerate(zip(starts, ends, oneways)):
+            u = snap(start)
+            v = snap(end)
+            # Uwzględniamy kierunkowość tak jak w Graph.add_edge
+            if oneway == 0 or oneway == 1:
+                sources.append(u)
+                targets.append(v)
+                edge_rows.append(row)
+            if oneway == 0 or oneway == 2:
+                sources.append(v)
+                targets.append(u)
+                edge_rows.append(row)
+
+        edge_rows = np.asarray(edge_rows, dtype=np.int64)
+        return cls._build(np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64),
+                          np.asarray(sources, dtype=np.int64), np.asarray(targets, dtype=np.int64),
+                          np.asarray(lengths, dtype=np.float64)[edge_rows],
+                          np.asarray(time_costs, dtype=np.float64)[edge_rows],
+                          np.asarray(road_ids, dtype=np.int64)[edge_rows],
+                          np.asarray(ids, dtype=np.int64)[edge_rows])
+
+    # Budowa z istniejącego obiektu Graph
+    @classmethod
+    def from_graph(cls, graph):
+        index = {node: i for i, node in enumerate(graph.nodes.values())}
+        sources, targets, lengths, time_costs, road_ids, ids = [], [], [], [], [], []
+        for node, u in index.items():
+            for edge in node.edges_out:
+                sources.append(u)
+                targets.append(index[graph.nodes[edge.id_to]])
+                lengths.append(edge.length)
+                time_costs.append(edge.time_cost)
+                road_ids.append(edge.id_road)
+                ids.append(edge.id)
+
+        return cls._build(np.array([node.x for node in index], dtype=np.float64),
+                          np.array([node.y for node in index], dtype=np.float64),
+                          np.asarray(sources, dtype=np.int64), np.asarray(targets, dtype=np.int64),
+                          np.asarray(lengths, dtype=np.float64), np.asarray(time_costs, dtype=np.float64),
+                          np.asarray(road_ids, dtype=np.int64), np.asarray(ids, dtype=np.int64))
+
+    @classmethod
+    def _build(cls, x, y, sources, targets, length, time_cost, road_id, edge_id):
+        order = np.argsort(sources, kind='stable')
+        offsets = np.zeros(len(x) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=len(x)), out=offsets[1:])
+        return cls(x, y, offsets, targets[order], length[order], time_cost[order],
+                   road_id[order], edge_id[order])
+
+    # Indeks węzła najbliższego podanym współrzędnym
+    def nearest_node(self, coords: tuple) -> int:
+        return int(np.argmin((self.x - coords[0]) ** 2 + (self.y - coords[1]) ** 2))
+
+    # Identyfikatory (FID) krawędzi o podanych pozycjach - do zapisu wyniku przez save_shp
+    def edge_ids(self, used_edges: list) -> list:
+        return [int(self.edge_id[e]) for e in used_edges]
+
+    def _astar(self, a: int, b: int, cost, speed: float):
+        offsets, targets, x, y = self.offsets, self.targets, self.x, self.y
+        bx, by = x[b], y[b]
+
+        def heuristic(v):
+            if speed == 0:  # Dijkstra
+                return 0
+            return math.hypot(bx - x[v], by - y[v]) / speed
+
+        g = {a: 0}
+        prev = {a: None}  # poprzedni węzeł i pozycja krawędzi, którą do niego dotarliśmy
+        visited = set()
+        queue = [(heuristic(a), a)]
+
+        while queue:
+            _, u = heapq.heappop(queue)
+            if u in visited:
+                continue
+            if u == b:
+                path = [b]
+                used_edges = []
+                while prev[path[-1]] is not None:
+                    u, e = prev[path[-1]]
+                    used_edges.append(e)
+                    path.append(u)
+                path.reverse()
+                used_edges.reverse()
+                return path, used_edges, g[b]
+            visited.add(u)
+
+            for e in range(offsets[u], offsets[u + 1]):
+                v = int(targets[e])
+                if v in visited:
+                    continue
+                new_g = g[u] + cost[e]
+                if new_g < g.get(v, float('inf')):
+                    g[v] = new_g
+                    prev[v] = (u, e)
+                    heapq.heappush(queue, (new_g + heuristic(v), v))
+
+        return None, [], float('inf')
+
+    # Algorytm A* do wyszukiwania najszybszej trasy
+    def astar_fastest(self, a: int, b: int):
+        path, used_edges, _ = self._astar(a, b, self.time_cost, MAX_SPEED)
+        return path, used_edges
+
+    def astar(self, a: int, b: int):
+        path, used_edges, _ = self._astar(a, b, self.length, 1)
+        return path, used_edges
+
+    def dijkstra(self, a: int, b: int):
+        path, used_edges, total_distance = self._astar(a, b, self.length, 0)
+        return None, path, used_edges, total_distance
@@ -3,64 +3,44 @@ import numpy as np
 import os
 
 from classes import *
+from csr import CSRGraph
+from loader import SPEED_DICT, DEFAULT_SPEED, BASE_PROFILE
+from spatial import SpatialIndex
 
-def load_shp_into_graph(workspace_path: str, shp_path: str, graph: 'Graph'):
+# Odczyt warstwy dróg przez arcpy do list kolumn (jak loader.read_roads); time_cost liczony jest
+# wektorowo z profilu bazowego, a atrybuty dróg zostają przy krawędziach dla profili z Graph.add_profile
+def read_roads_arcpy(workspace_path: str, shp_path: str) -> dict:
     arcpy.env.workspace = workspace_path
-
-    #Słownik prędkości (m/s)
-    speed_dict = {
-        "powiatowa": {
-            "droga zbiorcza": 60 / 3.6,
-            "droga lokalna": 50 / 3.6,
-            "droga wewnetrzna": 30 / 3.6,
-            "droga dojazdowa": 20 / 3.6,
-        },
-        "gminna": {
-            "droga zbiorcza": 50 / 3.6,
-            "droga lokalna": 40 / 3.6,
-            "droga wewnetrzna": 25 / 3.6,
-            "droga dojazdowa": 15 / 3.6,
-        },
-        "wojewódzka": {
-            "droga zbiorcza": 90 / 3.6,
-            "droga lokalna": 70 / 3.6,
-            "droga wewnetrzna": 40 / 3.6,
-            "droga dojazdowa": 30 / 3.6,
-        },
-        "wewnętrzna": {
-            "droga zbiorcza": 30 / 3.6,
-            "droga lokalna": 25 / 3.6,
-            "droga wewnetrzna": 15 / 3.6,
-            "droga dojazdowa": 10 / 3.6,
-        },
-        "krajowa": {
-            "droga główna": 100 / 3.6
-        }
-    }
-
-    default_speed = 50 /3.6
+    columns = {name: [] for name in ("fid", "start", "end", "length", "kat_zarzad", "klasa_drog", "oneway")}
 
     with arcpy.da.SearchCursor(shp_path, ["FID", "SHAPE@", "KAT_ZARZAD", "KLASA_DROG", "ONEWAY"]) as cursor:
         for row in cursor:
-            id = int(row[0])
             polyline = row[1]
-            length = polyline.getLength('PLANAR', 'METERS')  # Długość krawędzi w metrach
-            start_coords = (round(polyline.firstPoint.X), round(polyline.firstPoint.Y))
-            end_coords = (round(polyline.lastPoint.X), round(polyline.lastPoint.Y))
-
-            kat_zarzad = row[2]
-            klasa_drog = row[3]
+            columns["fid"].append(int(row[0]))
+            columns["start"].append((round(polyline.firstPoint.X), round(polyline.firstPoint.Y)))
+            columns["end"].append((round(polyline.lastPoint.X), round(polyline.lastPoint.Y)))
+            columns["length"].append(polyline.getLength('PLANAR', 'METERS'))  # Długość krawędzi w metrach
+            columns["kat_zarzad"].append(row[2])
+            columns["klasa_drog"].append(row[3])
+            columns["oneway"].append(int(row[4]))
+
+    columns["time_cost"] = BASE_PROFILE.evaluate(columns["length"], np.array(columns["kat_zarzad"], dtype=object),
+                                                 np.array(columns["klasa_drog"], dtype=object)).tolist()
+    return columns
 
-            if kat_zarzad in speed_dict and klasa_drog in speed_dict[kat_zarzad]:
-                speed = speed_dict[kat_zarzad][klasa_drog]
-            else:
-                speed = default_speed
-
-            time_cost = length / speed 
-            oneway = int(row[4])
-            
-            edge = Edge(id, start_coords, end_coords, id, length, time_cost, oneway)
-            graph.add_edge(edge)
+def load_shp_into_graph(workspace_path: str, shp_path: str, graph: 'Graph'):
+    roads = read_roads_arcpy(workspace_path, shp_path)
+    for id, start, end, length, time_cost, oneway, kat_zarzad, klasa_drog in zip(
+            *(roads[name] for name in ("fid", "start", "end", "length", "time_cost", "oneway", "kat_zarzad",
+                                       "klasa_drog"))):
+        edge = Edge(id, start, end, id, length, time_cost, oneway, kat_zarzad, klasa_drog)
+        graph.add_edge(edge)
+
+# Funkcja wczytująca warstwę od razu do zwartej reprezentacji CSR (bez obiektów Node/Edge)
+def load_shp_into_csr(workspace_path: str, shp_path: str, tolerance: float = 1) -> CSRGraph:
+    roads = read_roads_arcpy(workspace_path, shp_path)
+    return CSRGraph.from_edges(roads["fid"], roads["start"], roads["end"], roads["fid"], roads["length"],
+                               roads["time_cost"], roads["oneway"], tolerance)
 
 def calculate_euclidean_distance(p1, p2):
     return np.sqrt((p2[0] - p1[0])**2 + (p2[1]-p1[1])**2)
@@ -75,27 +55,10 @@ def get_start_end_points(workspace_path: str, shp_path: str) -> list[tuple]:
             points.append(coords)
     return points
 
-def find_nearest_nodes(points:list[tuple], graph:Graph):  
-    start = points[0]
-    end = points[1]
-    current_key_start = None
-    current_key_end = None
-    current_shortest_dist_start = float('inf')
-    current_shortest_dist_end = float('inf')
-    
-    for key in graph.nodes:
-        start_distance = calculate_euclidean_distance(start, key)
-        end_distance = calculate_euclidean_distance(end, key)
-
-        if start_distance < current_shortest_dist_start:
-            current_key_start = key
-            current_shortest_dist_start = start_distance
-
-        if end_distance < current_shortest_dist_end:
-            current_key_end = key
-            current_shortest_dist_end = end_distance
-            
-    return current_key_start, current_key_end
+# Funkcja zwracająca klucze graph.nodes węzłów najbliższych kolejnym punktom
+def find_nearest_nodes(points:list[tuple], graph:Graph, index:SpatialIndex = None) -> list[tuple]:
+    index = index or SpatialIndex(graph)  # indeks można zbudować raz i przekazywać do kolejnych wywołań
+    return index.snap(points)
 
 # Funkcja zapisująca wynikową ścieżkę do pliku shape
 def save_shp(workspace_path: str, shp_to_copy: str, shp_result: str, project_path: str, used_edges: list):
@@ -111,7 +74,7 @@ def save_shp(workspace_path: str, shp_to_copy: str, shp_result: str, project_pat
         spatial_reference=arcpy.Describe(shp_to_copy).spatialReference
     )
 
-    used_edges_id = [edge.id for edge in used_edges]
+    used_edges_id = [fid for edge in used_edges for fid in edge.fids]  # także odcinki krawędzi scalonych
 
     with arcpy.da.SearchCursor(shp_to_copy, ["FID", "SHAPE@"]) as search_cursor, \
          arcpy.da.InsertCursor(shp_result, ["FID", "SHAPE@"]) as insert_cursor:
@@ -128,3 +91,14 @@ def save_shp(workspace_path: str, shp_to_copy: str, shp_result: str, project_pat
         project.save()
 
     print(f"shape saved ok {shp_result}")
+
+# Funkcja dodająca zapisane warstwy (np. z shp_writer.write_layers) do projektu ArcGIS - projekt zapisywany raz
+def add_layers_to_project(project_path: str, paths: list):
+    project = arcpy.mp.ArcGISProject(project_path)
+
+    if project:
+        map = project.listMaps()[0]
+        for path in paths:
+            map.addDataFromPath(path)
+        project.save()
+        print("Dodano")
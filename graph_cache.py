@@ -0,0 +1,185 @@
+import gc
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+
+from classes import Graph, Edge, Node
+from csr import CSRGraph
+from loader import SPEED_DICT, DEFAULT_SPEED, load_graph, load_simplified_graph
+
+CACHE_VERSION = 5
+CACHE_DIR = '.graph_cache'
+
+# Zrzut grafu na dysk: katalog z plikami .npy (odczytywanymi przez mmap) i manifest.json.
+# Zrzut jest kluczowany skrótem plików warstwy, tabeli prędkości i tolerancji przyciągania,
+# więc zmiana danych źródłowych automatycznie go unieważnia. Skrót zawartości liczony jest tylko wtedy,
+# gdy rozmiar lub czas modyfikacji plików warstwy (source_stat) różni się od zapisanych w manifeście -
+# zwykłe uruchomienie nie czyta całej warstwy. Graf uproszczony (simplify=True,
+# loader.load_simplified_graph) ma osobny zrzut i klucz; FID-y krawędzi scalonych zapisywane są
+# jako tablica przesunięć edge_fid_offsets i płaska tablica edge_fids (udziały odcinków w edge_shares).
+
+SOURCE_EXTENSIONS = ('.shp', '.shx', '.dbf')
+
+def _settings(tolerance: float, simplify: bool) -> str:
+    return json.dumps([CACHE_VERSION, SPEED_DICT, DEFAULT_SPEED, tolerance, simplify], sort_keys=True)
+
+def source_hash(shp_path: str, tolerance: float = 1, simplify: bool = False) -> str:
+    digest = hashlib.sha256()
+    base = os.path.splitext(shp_path)[0]
+    for ext in SOURCE_EXTENSIONS:
+        if os.path.exists(base + ext):
+            with open(base + ext, 'rb') as file:
+                for block in iter(lambda: file.read(1 << 20), b''):
+                    digest.update(block)
+    digest.update(_settings(tolerance, simplify).encode())
+    return digest.hexdigest()
+
+# Rozmiar i czas modyfikacji (ns) plików warstwy - szybkie sprawdzenie, czy zrzut jest aktualny
+def source_stat(shp_path: str) -> list:
+    base = os.path.splitext(shp_path)[0]
+    return [[ext, os.stat(base + ext).st_size, os.stat(base + ext).st_mtime_ns]
+            for ext in SOURCE_EXTENSIONS if os.path.exists(base + ext)]
+
+def snapshot_path(shp_path: str, cache_dir: str = CACHE_DIR, simplify: bool = False) -> str:
+    name = os.path.splitext(os.path.basename(shp_path))[0]
+    return os.path.join(cache_dir, name + '_simplified' if simplify else name)
+
+def _manifest(path: str):
+    try:
+        with open(os.path.join(path, 'manifest.json')) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+def _write_manifest(path: str, manifest: dict):
+    with open(os.path.join(path, 'manifest.json'), 'w') as file:
+        json.dump(manifest, file)
+
+# Zapis grafu; krawędzie skierowane w kolejności węzłów i edges_out, tak jak w ch.graph_edges.
+# source - dodatkowe pola manifestu (stat i settings z ensure_snapshot)
+def save_snapshot(graph: Graph, path: str, key: str, source: dict = None):
+    nodes = list(graph.nodes.values())
+    index = {node: i for i, node in enumerate(nodes)}
+    edges = [edge for node in nodes for edge in node.edges_out]
+    csr = CSRGraph.from_graph(graph)
+
+    arrays = {
+        'node_x': np.array([node.x for node in nodes], dtype=np.int64),
+        'node_y': np.array([node.y for node in nodes], dtype=np.int64),
+        'edge_from': np.array([index[graph.nodes[edge.id_from]] for edge in edges], dtype=np.int64),
+        'edge_to': np.array([index[graph.nodes[edge.id_to]] for edge in edges], dtype=np.int64),
+        'edge_id': np.array([edge.id for edge in edges], dtype=np.int64),
+        'edge_road': np.array([edge.id_road for edge in edges], dtype=np.int64),
+        'edge_length': np.array([edge.length for edge in edges], dtype=np.float64),
+        'edge_time_cost': np.array([edge.time_cost for edge in edges], dtype=np.float64),
+        'edge_oneway': np.array([edge.oneway for edge in edges], dtype=np.int64),
+        'edge_kat_zarzad': np.array([edge.kat_zarzad or '' for edge in edges], dtype=str),
+        'edge_klasa_drog': np.array([edge.klasa_drog or '' for edge in edges], dtype=str),
+        'edge_bearings': np.array([edge.bearings or (np.nan, np.nan) for edge in edges],
+                                  dtype=np.float64).reshape(-1, 2),
+        'edge_fid_offsets': np.cumsum([0] + [len(edge.fids) for edge in edges], dtype=np.int64),
+        'edge_fids': np.array([fid for edge in edges for fid in edge.fids], dtype=np.int64),
+        'edge_shares': np.array([share for edge in edges for share in edge.shares], dtype=np.float64),
+        'csr_x': csr.x, 'csr_y': csr.y, 'csr_offsets': csr.offsets, 'csr_targets': csr.targets,
+        'csr_length': csr.length, 'csr_time_cost': csr.time_cost, 'csr_road_id': csr.road_id,
+        'csr_edge_id': csr.edge_id,
+    }
+
+    # zapis do katalogu tymczasowego i podmiana, żeby przerwany zapis nie zostawił uszkodzonego zrzutu
+    temp_path = path + '.tmp'
+    shutil.rmtree(temp_path, ignore_errors=True)
+    os.makedirs(temp_path)
+    for name, array in arrays.items():
+        np.save(os.path.join(temp_path, name + '.npy'), array)
+    _write_manifest(temp_path, {'version': CACHE_VERSION, 'key': key, 'tolerance': graph.snap_index.tolerance,
+                                'nodes': len(nodes), 'edges': len(edges), **(source or {})})
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(temp_path, path)
+
+def _load(path: str, name: str):
+    return np.load(os.path.join(path, name + '.npy'), mmap_mode='r')
+
+# Odtworzenie obiektu Graph ze zrzutu - bez ponownego przyciągania węzłów i bez dodawania krawędzi
+# pojedynczo: krawędzie zapisane są w kolejności węzłów początkowych, więc listy edges_out to wycinki
+# listy krawędzi, a edges_in wycinki tej listy posortowanej stabilnie po węźle końcowym (ta sama
+# kolejność, którą dałoby Graph._connect). Indeks przyciągania wypełniany jest jednym wywołaniem,
+# indeks dróg (Graph._roads) dopiero przy pierwszej zmianie kosztu, a odśmiecanie jest wstrzymane
+# na czas tworzenia obiektów (nie ma w nich cykli do zwolnienia).
+def load_snapshot_graph(path: str) -> Graph:
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _build_graph(path)
+    finally:
+        if enabled:
+            gc.enable()
+
+def _build_graph(path: str) -> Graph:
+    graph = Graph(_manifest(path)['tolerance'])
+    coords = list(zip(_load(path, 'node_x').tolist(), _load(path, 'node_y').tolist()))
+    nodes = [Node(x, y) for x, y in coords]
+    for i, node in enumerate(nodes):
+        node.index = i
+    graph.nodes = dict(zip(coords, nodes))
+    graph.snap_index.insert_many(coords, nodes)
+
+    edge_from = np.asarray(_load(path, 'edge_from'))
+    edge_to = np.asarray(_load(path, 'edge_to'))
+    columns = [_load(path, name).tolist() for name in ('edge_from', 'edge_to', 'edge_id', 'edge_road',
+                                                       'edge_length', 'edge_time_cost', 'edge_oneway',
+                                                       'edge_kat_zarzad', 'edge_klasa_drog')]
+    offsets = np.asarray(_load(path, 'edge_fid_offsets'))
+    flat, flat_shares = _load(path, 'edge_fids'), _load(path, 'edge_shares')
+    fids = [None] * len(columns[0])  # None - krawędź z jednego odcinka (Edge.fids = [id])
+    shares = [None] * len(columns[0])
+    for i in np.flatnonzero(np.diff(offsets) > 1).tolist():
+        fids[i] = flat[offsets[i]:offsets[i + 1]].tolist()
+        shares[i] = flat_shares[offsets[i]:offsets[i + 1]].tolist()
+    bearings = list(map(tuple, _load(path, 'edge_bearings').tolist()))  # (nan, nan) - krawędź bez geometrii
+    edges = [Edge(id, coords[u], coords[v], id_road, length, time_cost, oneway, kat_zarzad or None,
+                  klasa_drog or None, edge_fids, edge_bearings, edge_shares)
+             for u, v, id, id_road, length, time_cost, oneway, kat_zarzad, klasa_drog, edge_fids, edge_bearings,
+             edge_shares in zip(*columns, fids, bearings, shares)]
+    for i, edge in enumerate(edges):
+        edge.index = i
+    graph.edges = edges
+    graph._road_edges = None
+
+    bounds = np.concatenate(([0], np.cumsum(np.bincount(edge_from, minlength=len(nodes))))).tolist()
+    for node, start, end in zip(nodes, bounds[:-1], bounds[1:]):
+        node.edges_out = edges[start:end]
+    by_target = [edges[i] for i in np.argsort(edge_to, kind='stable').tolist()]
+    bounds = np.concatenate(([0], np.cumsum(np.bincount(edge_to, minlength=len(nodes))))).tolist()
+    for node, start, end in zip(nodes, bounds[:-1], bounds[1:]):
+        node.edges_in = by_target[start:end]
+    return graph
+
+# Reprezentacja CSR ze zrzutu - tablice mapowane z dysku, bez kopiowania
+def load_snapshot_csr(path: str) -> CSRGraph:
+    return CSRGraph(*(_load(path, 'csr_' + name) for name in ('x', 'y', 'offsets', 'targets', 'length',
+                                                              'time_cost', 'road_id', 'edge_id')))
+
+# Ścieżka do aktualnego zrzutu dla warstwy (budowanego, jeśli go brak lub jest nieaktualny)
+def ensure_snapshot(shp_path: str, cache_dir: str = CACHE_DIR, tolerance: float = 1, simplify: bool = False) -> str:
+    path = snapshot_path(shp_path, cache_dir, simplify)
+    source = {'stat': source_stat(shp_path), 'settings': _settings(tolerance, simplify)}
+    manifest = _manifest(path)
+    if manifest is not None and manifest.get('version') == CACHE_VERSION and \
+            all(manifest.get(name) == value for name, value in source.items()):
+        return path
+    key = source_hash(shp_path, tolerance, simplify)
+    if manifest is None or manifest.get('version') != CACHE_VERSION or manifest.get('key') != key:
+        graph = load_simplified_graph(shp_path, Graph(tolerance))[0] if simplify else load_graph(shp_path, Graph(tolerance))
+        save_snapshot(graph, path, key, source)
+    else:  # pliki zmienione bez zmiany zawartości (np. skopiowane) - zapamiętanie nowych czasów
+        manifest.update(source)
+        _write_manifest(path, manifest)
+    return path
+
+def cached_graph(shp_path: str, cache_dir: str = CACHE_DIR, tolerance: float = 1, simplify: bool = False) -> Graph:
+    return load_snapshot_graph(ensure_snapshot(shp_path, cache_dir, tolerance, simplify))
+
+def cached_csr(shp_path: str, cache_dir: str = CACHE_DIR, tolerance: float = 1) -> CSRGraph:
+    return load_snapshot_csr(ensure_snapshot(shp_path, cache_dir, tolerance))
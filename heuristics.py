@@ -0,0 +1,135 @@
+import heapq
+import math
+import numpy as np
+
+# Heurystyki dla Graph.astar / Graph.astar_fastest. Obiekt heurystyki wywoływany jest jako
+# heuristic(node, goal) i musi zwracać dolne ograniczenie kosztu dotarcia z node do goal
+# w metryce podanej w atrybucie cost ('length', 'time_cost' albo nazwa profilu).
+
+# Odległość w linii prostej podzielona przez największą prędkość metryki: 1 dla 'length', prędkość
+# maksymalna z Node.heuristic_time dla 'time_cost', CostProfile.top_speed dla profilu (wymaga grafu).
+# Z grafem prędkość dzielona jest też przez Graph.speedup(), więc przyspieszenie dróg przez
+# Graph.update_road nie sprawia, że heurystyka przeszacowuje koszt.
+class EuclideanHeuristic:
+    def __init__(self, cost: str = 'time_cost', graph=None):
+        self.cost = cost
+        if cost == 'length':
+            self._speed = 1
+        elif cost == 'time_cost':
+            self._speed = 100 / 3.6
+        elif graph is not None and cost in graph.profiles:
+            self._speed = graph.profiles[cost].top_speed
+        else:
+            raise ValueError(f"Heurystyka dla metryki {cost} wymaga grafu z profilem {cost}.")
+        self.speed = self._speed
+        if graph is not None and cost != 'length':  # długość nie zależy od mnożników czasu
+            self._update(graph, None)
+            graph.add_listener(self._update)
+
+    def _update(self, graph, id_road):
+        self.speed = self._speed / graph.speedup()
+
+    def __call__(self, node, goal) -> float:
+        return math.hypot(goal.x - node.x, goal.y - node.y) / self.speed
+
+# Dijkstra do wszystkich osiągalnych węzłów po liście sąsiedztwa adjacency[u] = [(v, koszt)]
+def _distances(adjacency: list, source: int) -> np.ndarray:
+    dist = np.full(len(adjacency), np.inf)
+    dist[source] = 0
+    queue = [(0, source)]
+    while queue:
+        d, u = heapq.heappop(queue)
+        if d > dist[u]:
+            continue
+        for v, w in adjacency[u]:
+            if d + w < dist[v]:
+                dist[v] = d + w
+                heapq.heappush(queue, (d + w, v))
+    return dist
+
+# Heurystyka ALT (A*, landmarks, triangle inequality). Dla każdego punktu orientacyjnego L
+# przechowywane są odległości d(L, v) i d(v, L) do/od wszystkich węzłów, a z nierówności trójkąta
+# d(v, t) >= d(L, t) - d(L, v) oraz d(v, t) >= d(v, L) - d(t, L). Odległości w grafie dają heurystykę
+# spójną, więc Graph._bidirectional nie musi jej skalować.
+class LandmarkHeuristic:
+    consistent = True
+
+    def __init__(self, graph, cost: str, landmarks: list, dist_from: np.ndarray, dist_to: np.ndarray):
+        self.cost = cost
+        self.landmarks = landmarks  # indeksy węzłów w kolejności Graph.nodes
+        self.index = {node: i for i, node in enumerate(graph.nodes.values())}
+        self.dist_from = dist_from  # tablica (liczba punktów, liczba węzłów): d(L, v)
+        self.dist_to = dist_to  # d(v, L)
+        # wiersze w postaci krotek - szybszy dostęp w pętli wyszukiwania niż indeksowanie tablic
+        self._from = [tuple(row) for row in dist_from.T.tolist()]
+        self._to = [tuple(row) for row in dist_to.T.tolist()]
+        # Odległości liczone są dla kosztów z chwili budowy. Wzrost kosztów (Graph.update_road) ich nie
+        # psuje - pozostają dolnymi ograniczeniami - a przy spadku kosztów wynik jest skalowany przez
+        # najmniejszy stosunek mnożnika obecnego do mnożnika z chwili budowy, więc heurystyki nie trzeba
+        # budować ponownie.
+        self.scale = 1
+        self._factors = {id_road: factor for id_road, (factor, _) in graph.overrides.items()}
+        graph.add_listener(self._update)
+
+    def _update(self, graph, id_road):
+        current = {id_road: factor for id_road, (factor, _) in graph.overrides.items()}
+        scale = 1
+        for road in set(current) | set(self._factors):
+            now, built = current.get(road, 1), self._factors.get(road, 1)
+            if self.cost == 'length':  # długość zmienia tylko zamknięcie drogi
+                now, built = (math.inf if math.isinf(now) else 1), (math.inf if math.isinf(built) else 1)
+            if now < built:
+                scale = min(scale, now / built)
+        self.scale = scale
+
+    @classmethod
+    def build(cls, graph, cost: str = 'time_cost', count: int = 8, landmarks: list = None):
+        nodes = list(graph.nodes.values())
+        index = {node: i for i, node in enumerate(nodes)}
+        forward = [[] for _ in nodes]
+        backward = [[] for _ in nodes]
+        weight = graph.edge_weight(cost)
+        for u, node in enumerate(nodes):
+            for edge in node.edges_out:
+                v = index[graph.nodes[edge.id_to]]
+                forward[u].append((v, weight(edge)))
+                backward[v].append((u, weight(edge)))
+
+        if landmarks is None:  # wybór punktów najdalszych od już wybranych
+            landmarks = []
+            dist = _distances(forward, 0)
+            closest = np.where(np.isfinite(dist), dist, -1)
+            for _ in range(min(count, len(nodes))):
+                landmark = int(np.argmax(closest))
+                landmarks.append(landmark)
+                dist = _distances(forward, landmark)
+                closest = np.minimum(closest, np.where(np.isfinite(dist), dist, -1))
+                closest[landmarks] = -1
+
+        dist_from = np.array([_distances(forward, landmark) for landmark in landmarks])
+        dist_to = np.array([_distances(backward, landmark) for landmark in landmarks])
+        return cls(graph, cost, landmarks, dist_from, dist_to)
+
+    def __call__(self, node, goal) -> float:
+        best = 0
+        for l_v, l_t in zip(self._from[self.index[node]], self._from[self.index[goal]]):
+            if l_t - l_v > best:  # porównania z nan (inf - inf) są fałszywe, więc takie punkty są pomijane
+                best = l_t - l_v
+        for v_l, t_l in zip(self._to[self.index[node]], self._to[self.index[goal]]):
+            if v_l - t_l > best:
+                best = v_l - t_l
+        if self.scale != 1:  # po otwarciu drogi zamkniętej w chwili budowy heurystyka jest wyłączana
+            return best * self.scale if self.scale else 0
+        return best
+
+    # Zapis odległości od punktów orientacyjnych na dysk (plik .npz)
+    def save(self, path: str):
+        np.savez(path, cost=np.array(self.cost), landmarks=np.array(self.landmarks, dtype=np.int64),
+                 dist_from=self.dist_from, dist_to=self.dist_to)
+
+    @classmethod
+    def load(cls, path: str, graph):
+        with np.load(path) as data:
+            if data['dist_from'].shape[1] != len(graph.nodes):
+                raise ValueError(f"Punkty orientacyjne {path} nie pasują do grafu.")
+            return cls(graph, str(data['cost']), data['landmarks'].tolist(), data['dist_from'], data['dist_to'])
@@ -0,0 +1,98 @@
+import heapq
+import itertools
+import math
+
+# Otoczka wypukła punktów (algorytm Andrew); zamknięty pierścień współrzędnych
+def convex_hull(points: list) -> list:
+    points = sorted(set(points))
+    if len(points) < 3:
+        return points
+
+    def cross(o, a, b):
+        return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+    lower, upper = [], []
+    for p in points:
+        while len(lower) >= 2 and cross(lower[-2], lower[-1], p) <= 0:
+            lower.pop()
+        lower.append(p)
+    for p in reversed(points):
+        while len(upper) >= 2 and cross(upper[-2], upper[-1], p) <= 0:
+            upper.pop()
+        upper.append(p)
+    ring = lower[:-1] + upper[:-1]
+    return ring + ring[:1]
+
+# Obszar osiągalny z węzła origin w budżecie kosztu (np. w sekundach dla 'time_cost')
+class Isochrone:
+    def __init__(self, origin, budget: float, cost: str, reached: dict, edges: list, partial_edges: list):
+        self.origin = origin
+        self.budget = budget
+        self.cost = cost
+        self.reached = reached  # węzeł -> koszt dotarcia
+        self.edges = edges  # krawędzie skierowane przejezdne w całości
+        self.partial_edges = partial_edges  # (krawędź, osiągnięta część długości 0..1)
+
+    # Krawędzie do zapisu przez save_shp (każdy obiekt warstwy raz). Obiekt zapisywany jest w całości, więc
+    # krawędź częściowa trafia do wyniku tylko wtedy, gdy osiągnięta jest co najmniej min_fraction jej długości
+    # (sumując części osiągnięte z obu końców drogi dwukierunkowej)
+    def used_edges(self, include_partial: bool = True, min_fraction: float = 0.5) -> list:
+        edges = dict()
+        for edge in self.edges:
+            edges.setdefault(edge.id, edge)
+        if include_partial:
+            reached = dict()
+            for edge, fraction in self.partial_edges:
+                reached[edge.id] = reached.get(edge.id, 0) + fraction
+            for edge, _ in self.partial_edges:
+                if reached[edge.id] >= min_fraction:
+                    edges.setdefault(edge.id, edge)
+        return list(edges.values())
+
+    # Linie osiągniętych fragmentów dróg: pełne krawędzie i krawędzie ucięte w miejscu wyczerpania budżetu
+    def polylines(self) -> list:
+        lines = [[edge.id_from, edge.id_to] for edge in self.edges]
+        for edge, fraction in self.partial_edges:
+            (x0, y0), (x1, y1) = edge.id_from, edge.id_to
+            lines.append([edge.id_from, (x0 + (x1 - x0) * fraction, y0 + (y1 - y0) * fraction)])
+        return lines
+
+    # Wielokąt (otoczka wypukła) osiągniętych węzłów i końców fragmentów dróg
+    def polygon(self) -> list:
+        points = [(node.x, node.y) for node in self.reached]
+        points += [line[-1] for line in self.polylines()]
+        return convex_hull(points)
+
+# Dijkstra jeden-do-wszystkich ograniczony budżetem: do kolejki trafiają tylko węzły osiągalne
+# w budżecie, więc przeglądany jest wyłącznie obszar izochrony, a nie cały graf
+def isochrone(graph, origin, budget: float, cost: str = 'time_cost') -> Isochrone:
+    weight = graph.edge_weight(cost)
+    counter = itertools.count()
+    queue = [(0, next(counter), origin)]
+    distances = {origin: 0}
+    reached = dict()
+    edges = []
+    partial_edges = []
+
+    while queue:
+        current_distance, _, current_node = heapq.heappop(queue)
+        if current_node in reached:
+            continue
+        reached[current_node] = current_distance
+
+        for edge in current_node.edges_out:
+            w = weight(edge)
+            if w == math.inf:  # droga zamknięta (Graph.update_road)
+                continue
+            distance = current_distance + w
+            if distance > budget:  # krawędź przejezdna tylko do miejsca wyczerpania budżetu
+                if current_distance < budget:
+                    partial_edges.append((edge, (budget - current_distance) / w))
+                continue
+            edges.append(edge)
+            neighbor = graph.nodes[edge.id_to]
+            if neighbor not in reached and distance < distances.get(neighbor, float('inf')):
+                distances[neighbor] = distance
+                heapq.heappush(queue, (distance, next(counter), neighbor))
+
+    return Isochrone(origin, budget, cost, reached, edges, partial_edges)
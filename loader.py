@@ -0,0 +1,124 @@
+import numpy as np
+
+from classes import Graph, Edge
+from csr import CSRGraph
+from profiles import CostProfile
+from shp_reader import ShapefileReader
+from simplify import simplify_roads
+
+#Słownik prędkości (m/s)
+SPEED_DICT = {
+    "powiatowa": {
+        "droga zbiorcza": 60 / 3.6,
+        "droga lokalna": 50 / 3.6,
+        "droga wewnetrzna": 30 / 3.6,
+        "droga dojazdowa": 20 / 3.6,
+    },
+    "gminna": {
+        "droga zbiorcza": 50 / 3.6,
+        "droga lokalna": 40 / 3.6,
+        "droga wewnetrzna": 25 / 3.6,
+        "droga dojazdowa": 15 / 3.6,
+    },
+    "wojewódzka": {
+        "droga zbiorcza": 90 / 3.6,
+        "droga lokalna": 70 / 3.6,
+        "droga wewnetrzna": 40 / 3.6,
+        "droga dojazdowa": 30 / 3.6,
+    },
+    "wewnętrzna": {
+        "droga zbiorcza": 30 / 3.6,
+        "droga lokalna": 25 / 3.6,
+        "droga wewnetrzna": 15 / 3.6,
+        "droga dojazdowa": 10 / 3.6,
+    },
+    "krajowa": {
+        "droga główna": 100 / 3.6
+    }
+}
+
+DEFAULT_SPEED = 50 / 3.6
+
+# Funkcja zwracająca prędkość (m/s) dla kategorii zarządu i klasy drogi
+def get_speed(kat_zarzad, klasa_drog) -> float:
+    if kat_zarzad in SPEED_DICT and klasa_drog in SPEED_DICT[kat_zarzad]:
+        return SPEED_DICT[kat_zarzad][klasa_drog]
+    return DEFAULT_SPEED
+
+# Profil odpowiadający SPEED_DICT - z niego liczony jest koszt time_cost krawędzi
+BASE_PROFILE = CostProfile('time_cost', SPEED_DICT, DEFAULT_SPEED)
+
+ROAD_FIELDS = ["KAT_ZARZAD", "KLASA_DROG", "ONEWAY"]
+
+# Odczyt warstwy dróg bez arcpy - słownik tablic: fid, start, end (współrzędne zaokrąglone do metra),
+# length, time_cost, kat_zarzad, klasa_drog, oneway, start_bearing, end_bearing (kierunki pierwszego
+# i ostatniego odcinka linii zgodnie z geometrią, do klasyfikacji skrętów w turns.TurnModel). Brakujące atrybuty (np. brak pliku .dbf)
+# traktowane są jak drogi dwukierunkowe o domyślnej prędkości. Obiekty bez geometrii są pomijane.
+# Przy odczycie w częściach można przekazać otwarty reader, żeby nie wczytywać indeksu .shx ponownie.
+def read_roads(shp_path: str, fids=None, reader: ShapefileReader = None) -> dict:
+    reader = reader if reader is not None else ShapefileReader(shp_path)
+    fids = np.arange(len(reader)) if fids is None else np.asarray(fids, dtype=np.int64)
+    starts, ends, length, start_bearing, end_bearing = reader.read_lines(fids, directions=True)
+    attributes = reader.read_attributes(ROAD_FIELDS, fids)
+
+    count = len(fids)
+    kat_zarzad = attributes["KAT_ZARZAD"] if attributes["KAT_ZARZAD"] is not None else np.full(count, None, dtype=object)
+    klasa_drog = attributes["KLASA_DROG"] if attributes["KLASA_DROG"] is not None else np.full(count, None, dtype=object)
+    oneway = attributes["ONEWAY"] if attributes["ONEWAY"] is not None else np.zeros(count)
+    time_cost = BASE_PROFILE.evaluate(length, kat_zarzad, klasa_drog)
+
+    valid = np.isfinite(starts).all(axis=1) & np.isfinite(ends).all(axis=1)
+    return {
+        "fid": fids[valid],
+        "start": np.round(starts[valid]).astype(np.int64),
+        "end": np.round(ends[valid]).astype(np.int64),
+        "length": length[valid],
+        "time_cost": time_cost[valid],
+        "kat_zarzad": kat_zarzad[valid],
+        "klasa_drog": klasa_drog[valid],
+        "oneway": np.nan_to_num(oneway[valid]).astype(np.int64),
+        "start_bearing": start_bearing[valid],
+        "end_bearing": end_bearing[valid],
+    }
+
+# Odpowiednik functions.load_shp_into_graph bez arcpy
+def load_graph(shp_path: str, graph: Graph = None) -> Graph:
+    graph = graph if graph is not None else Graph()
+    roads = read_roads(shp_path)
+    columns = [roads[name].tolist() for name in ("fid", "start", "end", "length", "time_cost", "oneway",
+                                                 "kat_zarzad", "klasa_drog", "start_bearing", "end_bearing")]
+    for id, start, end, length, time_cost, oneway, kat_zarzad, klasa_drog, start_bearing, end_bearing in zip(*columns):
+        graph.add_edge(Edge(id, tuple(start), tuple(end), id, length, time_cost, oneway, kat_zarzad, klasa_drog,
+                            bearings=(start_bearing, end_bearing)))
+    return graph
+
+# Wczytanie grafu po oczyszczeniu topologii i scaleniu łańcuchów węzłów stopnia 2 (simplify.simplify_roads).
+# Zwraca (graf, raport) - raport podaje liczby węzłów i krawędzi skierowanych przed i po uproszczeniu.
+# Węzły dodawane są przed krawędziami, w kolejności przyciągania, więc zostają te same węzły co w load_graph.
+def load_simplified_graph(shp_path: str, graph: Graph = None, dangle_length: float = 3.0, keep=()) -> tuple:
+    graph = graph if graph is not None else Graph()
+    roads, report = simplify_roads(read_roads(shp_path), graph.snap_index.tolerance, dangle_length, keep)
+    for coords in zip(roads["start"].tolist(), roads["end"].tolist()):
+        for point in map(tuple, coords):
+            if point not in graph.nodes:
+                graph.add_node(point)
+    columns = [roads[name].tolist() for name in ("fid", "start", "end", "length", "time_cost", "oneway",
+                                                 "kat_zarzad", "klasa_drog", "start_bearing", "end_bearing")]
+    for (id, start, end, length, time_cost, oneway, kat_zarzad, klasa_drog, start_bearing, end_bearing), fids, \
+            shares in zip(zip(*columns), roads["fids"], roads["shares"]):
+        graph.add_edge(Edge(id, tuple(start), tuple(end), id, length, time_cost, oneway, kat_zarzad, klasa_drog,
+                            fids, (start_bearing, end_bearing), shares))
+    return graph, report
+
+# Odpowiednik functions.load_shp_into_csr bez arcpy
+def load_csr(shp_path: str, tolerance: float = 1) -> CSRGraph:
+    roads = read_roads(shp_path)
+    return CSRGraph.from_edges(roads["fid"], [tuple(p) for p in roads["start"].tolist()],
+                               [tuple(p) for p in roads["end"].tolist()], roads["fid"],
+                               roads["length"], roads["time_cost"], roads["oneway"].tolist(), tolerance)
+
+# Odpowiednik functions.get_start_end_points bez arcpy - pierwszy punkt każdego obiektu warstwy
+def read_first_points(shp_path: str) -> list[tuple]:
+    reader = ShapefileReader(shp_path)
+    starts, _, _ = reader.read_lines()
+    return [tuple(point) for point in starts.tolist()]
@@ -1,7 +1,9 @@
 from functions import *
+from graph_cache import cached_graph
+from loader import read_first_points
+from shp_writer import write_layers
 
 if __name__ == "__main__":
-    graph = Graph()
     cwd = os.getcwd()
 
     workspace = cwd + '/jezdnie_torun'
@@ -11,26 +13,24 @@ if __name__ == "__main__":
     shp_result_alt = "result_points_alt4"
     project_path = workspace + r'\MyProject3.aprx'
 
-    load_shp_into_graph(workspace, shp_path, graph)
-    points = get_start_end_points(workspace, shp_points)
-    start, end = find_nearest_nodes(points, graph)
+    graph = cached_graph(os.path.join(workspace, shp_path))  # zrzut grafu budowany tylko po zmianie danych
+    points = read_first_points(os.path.join(workspace, shp_points))
+    start, end = find_nearest_nodes(points[:2], graph)
     a = graph.nodes[start]
     b = graph.nodes[end]
 
-    result, used_edges = graph.astar_fastest(a, b) #zmiana metody w zależności od trasy najszybsza/najkrotsza
-
-    # Znalezienie alternatywnej trasy kiedy te z pierwszej mają podwojoną długość
-    for edge in used_edges:
-        edge.time_cost = edge.time_cost * 2  #dla najkrotszej: .length, dla najszybszej: .time_cost
-
-    graph.reset_nodes()
-    result_alt, used_edges_alt = graph.astar_fastest(a, b) #zmiana metody w zależności od trasy najszybsza/najkrotsza
+    # Trasa najszybsza i alternatywna, wyznaczona przy podwojonym koszcie dróg pierwszej trasy
+    # (kary nie zmieniają grafu); dla najkrótszej: cost='length'
+    routes = graph.alternatives(a, b, k=2, method='penalty', cost='time_cost', penalty=2)
+    used_edges = routes[0].used_edges if routes else []
+    used_edges_alt = routes[-1].used_edges if routes else []
 
     shp_result_dijkstra = 'result_dijkstra'  
     _, result_dijkstra, used_edges_dijkstra, total_distance_dijkstra = graph.dijkstra(a, b)
     #print(total_distance_dijkstra)
-    save_shp(workspace, shp_path, shp_result_dijkstra, project_path, used_edges_dijkstra)
 
-    # Zapis warstw do shp
-    save_shp(workspace, shp_path, shp_result, project_path, used_edges)
-    save_shp(workspace, shp_path, shp_result_alt, project_path, used_edges_alt)
\ No newline at end of file
+    # Zapis warstw do shp - wszystkie trasy w jednym przebiegu po warstwie źródłowej
+    paths = write_layers(os.path.join(workspace, shp_path), {shp_result_dijkstra: used_edges_dijkstra,
+                                                             shp_result: used_edges,
+                                                             shp_result_alt: used_edges_alt}, workspace)
+    add_layers_to_project(project_path, paths)
@@ -0,0 +1,101 @@
+import heapq
+from functools import partial
+
+# Kolejki priorytetowe wyszukiwań Graph._astar, Graph._bidirectional i Graph._dijkstra (wybierane przez
+# Graph.queue). Wpisy to krotki (klucz, Node.index, węzeł) - przy równych kluczach rozstrzyga numer węzła,
+# więc obiekty węzłów nigdy nie są porównywane. Obie kolejki mają ten sam interfejs: push(wpis), pop(),
+# queue[0] (wpis o najmniejszym kluczu), len() i decreases (liczba zmniejszeń klucza do SearchStats).
+#
+# Pomiar na dołączonej warstwie (60 par, benchmark.py --queue, czas łączny): BinaryHeap jest szybsza
+# (astar 1.1-1.2 s, astar_fastest 2.4-2.5 s, dijkstra 1.9-2.0 s wobec 1.4 s, 2.4-2.7 s i 3.0-3.4 s),
+# bo heapq działa w C, a IndexedHeap przesuwa wpisy w Pythonie. IndexedHeap nie trzyma za to
+# przestarzałych wpisów (o ok. 10% mniej wstawień, mniejszy szczyt kolejki) - przydatne przy gęstych grafach.
+
+# Kopiec binarny heapq z leniwym usuwaniem: poprawa odległości dodaje nowy wpis, a przestarzałe
+# wpisy pomija pętla wyszukiwania (węzeł już ustalony). push i pop to funkcje heapq związane z listą.
+class BinaryHeap(list):
+    decreases = 0
+
+    def __init__(self, entries=()):
+        super().__init__(entries)
+        heapq.heapify(self)
+
+    @property
+    def push(self):
+        return partial(heapq.heappush, self)
+
+    @property
+    def pop(self):
+        return partial(heapq.heappop, self)
+
+# Kopiec binarny z operacją zmniejszenia klucza, indeksowany numerami węzłów. Każdy węzeł występuje
+# w kopcu co najwyżej raz, więc poprawa odległości nie zostawia przestarzałych wpisów. Położenie wpisów
+# trzymane jest w słowniku, więc kolejka nie alokuje niczego dla węzłów, których wyszukiwanie nie dotknęło.
+class IndexedHeap:
+    __slots__ = ('_heap', '_pos', 'decreases')
+
+    def __init__(self, entries=()):
+        self._heap = []  # wpisy w kolejności kopca
+        self._pos = dict()  # numer węzła -> pozycja wpisu w kopcu
+        self.decreases = 0
+        for entry in entries:
+            self.push(entry)
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __bool__(self):
+        return bool(self._heap)
+
+    def __getitem__(self, i: int) -> tuple:
+        return self._heap[i]
+
+    # Wstawienie węzła albo zmniejszenie jego klucza; klucz nie mniejszy od obecnego jest ignorowany
+    def push(self, entry: tuple):
+        heap, pos = self._heap, self._pos
+        i = pos.get(entry[1])
+        if i is None:
+            i = len(heap)
+            heap.append(entry)
+        elif entry[0] < heap[i][0]:
+            self.decreases += 1
+        else:
+            return
+        self._sift_up(i, entry)
+
+    # Zdjęcie wpisu o najmniejszym kluczu
+    def pop(self) -> tuple:
+        heap, pos = self._heap, self._pos
+        top = heap[0]
+        del pos[top[1]]
+        last = heap.pop()
+        if heap:
+            # jak w heapq: zejście ścieżką mniejszych dzieci do liścia, potem przesunięcie w górę
+            size = len(heap)
+            i = 0
+            child = 1
+            while child < size:
+                right = child + 1
+                if right < size and heap[right] < heap[child]:
+                    child = right
+                entry = heap[child]
+                heap[i] = entry
+                pos[entry[1]] = i
+                i = child
+                child = 2 * i + 1
+            self._sift_up(i, last)
+        return top
+
+    def _sift_up(self, i: int, entry: tuple):
+        heap, pos = self._heap, self._pos
+        while i > 0:
+            parent = (i - 1) >> 1
+            parent_entry = heap[parent]
+            if entry < parent_entry:
+                heap[i] = parent_entry
+                pos[parent_entry[1]] = i
+                i = parent
+            else:
+                break
+        heap[i] = entry
+        pos[entry[1]] = i
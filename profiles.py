@@ -0,0 +1,66 @@
+import json
+import numpy as np
+
+# Profil kosztu przejazdu: prędkości (m/s) dla kategorii zarządu i klasy drogi, prędkość domyślna,
+# opcjonalne ograniczenie prędkości maksymalnej (np. ciężarówki) i mnożniki czasu dla kategorii
+# zarządu (np. kara za drogi wewnętrzne). Koszty liczone są wektorowo dla wszystkich krawędzi naraz.
+class CostProfile:
+    def __init__(self, name: str, speeds: dict, default_speed: float, max_speed: float = None, factors: dict = None):
+        self.name = name
+        self.speeds = speeds
+        self.default_speed = default_speed
+        self.max_speed = max_speed
+        self.factors = factors or dict()
+
+    def speed(self, kat_zarzad, klasa_drog) -> float:
+        speed = self.speeds.get(kat_zarzad, {}).get(klasa_drog, self.default_speed)
+        return min(speed, self.max_speed) if self.max_speed else speed
+
+    # Największa prędkość efektywna w profilu (z uwzględnieniem mnożników < 1) - do heurystyki
+    # odległości w linii prostej
+    @property
+    def top_speed(self) -> float:
+        speeds = [speed for classes in self.speeds.values() for speed in classes.values()] + [self.default_speed]
+        speed = min(max(speeds), self.max_speed) if self.max_speed else max(speeds)
+        return speed / min([1] + list(self.factors.values()))
+
+    # Czas przejazdu (s) dla tablic długości i atrybutów krawędzi
+    def evaluate(self, length, kat_zarzad, klasa_drog) -> np.ndarray:
+        # słownik przeglądany raz dla każdej pary (kategoria, klasa), a nie dla każdej krawędzi
+        kat_values, kat_codes = np.unique(np.asarray(kat_zarzad).astype(str), return_inverse=True)
+        klasa_values, klasa_codes = np.unique(np.asarray(klasa_drog).astype(str), return_inverse=True)
+        pairs, inverse = np.unique(kat_codes * len(klasa_values) + klasa_codes, return_inverse=True)
+        pair_cost = []
+        for pair in pairs.tolist():
+            kat = str(kat_values[pair // len(klasa_values)])
+            klasa = str(klasa_values[pair % len(klasa_values)])
+            pair_cost.append(self.factors.get(kat, 1) / self.speed(kat, klasa))
+        return np.asarray(length, dtype=np.float64) * np.asarray(pair_cost, dtype=np.float64)[inverse]
+
+# Odczyt profili z pliku JSON. Prędkości podawane są w km/h, a profil może dziedziczyć
+# ustawienia innego profilu przez pole "base", np.
+# {"car": {"default_speed": 50, "speeds": {"gminna": {"droga lokalna": 40}}},
+#  "truck": {"base": "car", "max_speed": 70}}
+def load_profiles(path: str = 'profiles.json') -> dict:
+    with open(path, encoding='utf-8') as file:
+        config = json.load(file)
+
+    def resolve(name, seen=()):
+        if name in seen:
+            raise ValueError(f"Cykliczne dziedziczenie profilu {name}.")
+        entry = dict(config[name])
+        if 'base' in entry:
+            base = resolve(entry.pop('base'), seen + (name,))
+            base.update(entry)
+            entry = base
+        return entry
+
+    profiles = dict()
+    for name in config:
+        entry = resolve(name)
+        speeds = {kat: {klasa: speed / 3.6 for klasa, speed in classes.items()}
+                  for kat, classes in entry.get('speeds', {}).items()}
+        max_speed = entry.get('max_speed')
+        profiles[name] = CostProfile(name, speeds, entry.get('default_speed', 50) / 3.6,
+                                     max_speed / 3.6 if max_speed else None, entry.get('factors'))
+    return profiles
@@ -15,7 +15,7 @@ def connect_nodes_in_neo4j(graph, unique_nodes):
     with GraphDatabase.driver(URI, auth=AUTH) as driver:
         for node in unique_nodes:
             for edge in node.edges_out:
-                neighbour = graph.nodes[node_exists(generate_4_ids(edge.id_to), graph.nodes)]
+                neighbour = graph.nodes[edge.id_to]
                 neighbour_id = str((neighbour.x, neighbour.y))
                 node_id = str((node.x, node.y))
                 try:
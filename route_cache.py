@@ -0,0 +1,87 @@
+from collections import OrderedDict
+
+from search_stats import SearchStats
+
+# Liczba krawędzi w wyniku: (ścieżka, krawędzie) z astar albo (None, ścieżka, krawędzie, koszt) z dijkstra
+def _edge_count(result: tuple) -> int:
+    return len(result[2] if len(result) == 4 else result[1])
+
+# Pamięć podręczna wyników wyszukiwania tras przed Graph.astar, Graph.astar_fastest i Graph.dijkstra.
+# Kluczem jest algorytm, para węzłów (po przyciągnięciu) i metryka. Rozmiar ograniczają liczba wpisów
+# i łączna liczba zapamiętanych krawędzi - przy przekroczeniu usuwane są najdawniej używane wpisy (LRU).
+# Po zmianie kosztów krawędzi (Graph.update_road zwiększa graph.version) cała zawartość jest unieważniana.
+# Metody astar_fastest, astar i dijkstra mają te same parametry co w Graph; przekazany stats
+# dostaje liczniki wyszukiwania przy chybieniu, a przy trafieniu - zapytanie z cache_hits.
+class RouteCache:
+    def __init__(self, graph, max_entries: int = 1024, max_edges: int = None):
+        self.graph = graph
+        self.max_entries = max_entries
+        self.max_edges = max_edges
+        self._entries = OrderedDict()
+        self._edges = 0  # łączna liczba krawędzi w zapamiętanych wynikach
+        self._version = graph.version
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        graph.add_listener(self._invalidate)
+
+    def _invalidate(self, graph, id_road=None):
+        if self._entries:
+            self.invalidations += 1
+        self._entries.clear()
+        self._edges = 0
+        self._version = graph.version
+
+    def clear(self):
+        self._invalidate(self.graph)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        queries = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits / queries if queries else 0.0,
+                'entries': len(self._entries), 'edges': self._edges, 'evictions': self.evictions,
+                'invalidations': self.invalidations}
+
+    # Wynik z pamięci albo z wywołania compute(); zwracane są kopie list, żeby zmiana wyniku
+    # przez wywołującego nie zmieniła zapamiętanej wartości
+    def _get(self, key: tuple, compute, stats: SearchStats = None):
+        if stats is not None:
+            stats.start()
+        if self._version != self.graph.version:  # np. gdy lista graph.listeners została wyczyszczona
+            self._invalidate(self.graph)
+        result = self._entries.get(key)
+        if result is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            if stats is not None:
+                stats.cache_hit()
+        else:
+            self.misses += 1
+            result = compute()
+            self._entries[key] = result
+            self._edges += _edge_count(result)
+            self._evict()
+        return tuple(list(value) if isinstance(value, list) else value for value in result)
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or
+                                 (self.max_edges is not None and self._edges > self.max_edges)):
+            _, result = self._entries.popitem(last=False)
+            self._edges -= _edge_count(result)
+            self.evictions += 1
+
+    def astar_fastest(self, a, b, heuristic=None, bidirectional: bool = False, profile: str = None,
+                      stats: SearchStats = None):
+        return self._get(('astar_fastest', a.id, b.id, profile or 'time_cost'),
+                         lambda: self.graph.astar_fastest(a, b, heuristic, bidirectional, profile, stats), stats)
+
+    def astar(self, a, b, heuristic=None, bidirectional: bool = False, stats: SearchStats = None):
+        return self._get(('astar', a.id, b.id, 'length'),
+                         lambda: self.graph.astar(a, b, heuristic, bidirectional, stats), stats)
+
+    def dijkstra(self, a, b, bidirectional: bool = False, profile: str = None, stats: SearchStats = None):
+        return self._get(('dijkstra', a.id, b.id, profile or 'length'),
+                         lambda: self.graph.dijkstra(a, b, bidirectional, profile, stats), stats)
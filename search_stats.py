@@ -0,0 +1,71 @@
+import time
+
+# Liczniki wyszukiwania dla Graph.astar, Graph.astar_fastest i Graph.dijkstra (parametr stats),
+# także wywoływanych przez route_cache.RouteCache - zapytania obsłużone z pamięci liczy cache_hits.
+# Ten sam obiekt przekazany do wielu zapytań sumuje ich liczniki, a obiekty z osobnych zapytań
+# można dodawać (stats_a + stats_b) albo zsumować przez SearchStats.aggregate(lista).
+# Większość liczników wyliczana jest po zakończeniu wyszukiwania z licznika wstawień do kolejki,
+# rozmiaru kolejki i zbioru ustalonych węzłów, więc pętla wyszukiwania ich nie aktualizuje.
+class SearchStats:
+    FIELDS = ('queries', 'cache_hits', 'pops', 'stale_pops', 'settled', 'pushes', 'relaxations', 'heap_max',
+              'wall_time')
+
+    def __init__(self):
+        self.queries = 0
+        self.cache_hits = 0  # zapytania obsłużone z pamięci podręcznej tras (bez wyszukiwania)
+        self.pops = 0  # pobrania z kolejki
+        self.stale_pops = 0  # pobrania węzłów już ustalonych (przestarzałe wpisy kolejki)
+        self.settled = 0  # węzły ustalone
+        self.pushes = 0  # wstawienia do kolejki
+        self.relaxations = 0  # poprawy odległości węzła (wstawienia poza węzłami startowymi i zmniejszenia klucza)
+        self.heap_max = 0  # największy rozmiar kolejki (dla sumy - największy z zapytań)
+        self.wall_time = 0.0  # czas wyszukiwania (s)
+        self._start = None
+
+    def start(self):
+        self._start = time.perf_counter()
+
+    # Zapis wyniku wyszukiwania: pushes - liczba wstawień, remaining - wpisy pozostałe w kolejce,
+    # settled - liczba ustalonych węzłów, initial - liczba węzłów startowych w kolejce,
+    # decreases - ile z wstawień zmniejszyło klucz wpisu już obecnego w kolejce (pqueue.IndexedHeap)
+    def finish(self, pushes: int, remaining: int, settled: int, heap_max: int, initial: int = 1,
+               decreases: int = 0):
+        pops = pushes - decreases - remaining
+        self.queries += 1
+        self.pops += pops
+        self.stale_pops += pops - settled
+        self.settled += settled
+        self.pushes += pushes - decreases
+        self.relaxations += max(pushes - initial, 0)
+        self.heap_max = max(self.heap_max, heap_max)
+        if self._start is not None:
+            self.wall_time += time.perf_counter() - self._start
+            self._start = None
+
+    # Zapytanie obsłużone z pamięci podręcznej - liczy się jako zapytanie bez ustalonych węzłów
+    def cache_hit(self):
+        self.queries += 1
+        self.cache_hits += 1
+        if self._start is not None:
+            self.wall_time += time.perf_counter() - self._start
+            self._start = None
+
+    def __add__(self, other):
+        result = SearchStats()
+        for name in self.FIELDS:
+            setattr(result, name, getattr(self, name) + getattr(other, name))
+        result.heap_max = max(self.heap_max, other.heap_max)
+        return result
+
+    @classmethod
+    def aggregate(cls, stats: list):
+        result = cls()
+        for item in stats:
+            result = result + item
+        return result
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    def __repr__(self):
+        return 'SearchStats(' + ', '.join(f'{name}={getattr(self, name)}' for name in self.FIELDS) + ')'
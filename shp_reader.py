@@ -0,0 +1,164 @@
+import os
+import numpy as np
+
+POINT_TYPES = (1, 11, 21)
+POLYLINE_TYPES = (3, 13, 23)
+
+# Odczyt warstwy shapefile bez arcpy. Plik .shp jest mapowany do pamięci, a położenie
+# rekordów pobierane z indeksu .shx, więc odczyt wybranych obiektów nie wymaga przeglądania
+# całego pliku. Numer obiektu (FID) to numer rekordu liczony od zera, tak jak w ArcGIS.
+class ShapefileReader:
+    def __init__(self, shp_path: str):
+        base = os.path.splitext(shp_path)[0]
+        self.path = base + '.shp'
+        self.data = np.memmap(self.path, dtype=np.uint8, mode='r')
+
+        header = self.data[:100]
+        if header[:4].view('>i4')[0] != 9994:
+            raise ValueError(f"Plik {self.path} nie jest plikiem shapefile.")
+        self.shape_type = int(header[32:36].view('<i4')[0])
+        self.bbox = tuple(header[36:68].view('<f8').tolist())  # xmin, ymin, xmax, ymax
+
+        # .shx: po nagłówku pary (offset, długość) w słowach 16-bitowych, big-endian
+        index = np.fromfile(base + '.shx', dtype='>i4', offset=100).reshape(-1, 2)
+        self.offsets = index[:, 0].astype(np.int64) * 2 + 8  # początek treści rekordu w bajtach
+        self.lengths = index[:, 1].astype(np.int64) * 2
+
+        self.encoding = 'utf-8'
+        if os.path.exists(base + '.cpg'):
+            with open(base + '.cpg') as cpg:
+                self.encoding = cpg.read().strip() or self.encoding
+        self.dbf_path = base + '.dbf' if os.path.exists(base + '.dbf') else None
+        self._fields = None
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def _fids(self, fids):
+        if fids is None:
+            return np.arange(len(self))
+        return np.asarray(fids, dtype=np.int64)
+
+    # Wektorowy odczyt wartości o stałym rozmiarze spod dowolnych (niewyrównanych) pozycji bajtowych
+    def _gather(self, positions, dtype: str, count: int = 1):
+        size = np.dtype(dtype).itemsize * count
+        raw = self.data[positions[:, None] + np.arange(size)]
+        return raw.view(dtype).reshape(len(positions), count) if count > 1 else raw.view(dtype).ravel()
+
+    # Surowa treść rekordu (bez nagłówka rekordu) - np. do przepisania geometrii do innej warstwy
+    def record_bytes(self, fid: int) -> bytes:
+        return self.data[self.offsets[fid]:self.offsets[fid] + self.lengths[fid]].tobytes()
+
+    # Części i punkty linii dla wybranych obiektów: (numer obiektu każdego punktu, początki części, punkty (P, 2))
+    def read_points(self, fids=None):
+        fids = self._fids(fids)
+        offsets = self.offsets[fids]
+        if self.shape_type in POINT_TYPES:
+            return np.arange(len(fids)), np.arange(len(fids)), self._gather(offsets + 4, '<f8', 2)
+        if self.shape_type not in POLYLINE_TYPES:
+            raise ValueError(f"Nieobsługiwany typ geometrii {self.shape_type}.")
+
+        num_parts = np.zeros(len(fids), dtype=np.int64)
+        num_points = np.zeros(len(fids), dtype=np.int64)
+        valid = self.lengths[fids] > 4  # rekordy z pustą geometrią (typ 0) nie mają części ani punktów
+        num_parts[valid] = self._gather(offsets[valid] + 36, '<i4')
+        num_points[valid] = self._gather(offsets[valid] + 40, '<i4')
+        point_base = np.cumsum(num_points) - num_points  # pierwszy punkt obiektu w wynikowej tablicy
+
+        record_of_part = np.repeat(np.arange(len(fids)), num_parts)
+        part_index = np.arange(num_parts.sum()) - np.repeat(np.cumsum(num_parts) - num_parts, num_parts)
+        parts = self._gather(offsets[record_of_part] + 44 + 4 * part_index, '<i4').astype(np.int64)
+        part_starts = point_base[record_of_part] + parts
+
+        record_of_point = np.repeat(np.arange(len(fids)), num_points)
+        point_index = np.arange(num_points.sum()) - point_base[record_of_point]
+        positions = offsets[record_of_point] + 44 + 4 * num_parts[record_of_point] + 16 * point_index
+        return record_of_point, part_starts, self._gather(positions, '<f8', 2)
+
+    # Pierwszy i ostatni punkt oraz długość planarna linii (odpowiednik firstPoint/lastPoint/getLength).
+    # Z directions=True także kierunki (radiany, atan2(dy, dx)) pierwszego i ostatniego odcinka linii -
+    # nan dla linii bez odcinka o niezerowej długości na końcu
+    def read_lines(self, fids=None, directions: bool = False):
+        fids = self._fids(fids)
+        record_of_point, part_starts, points = self.read_points(fids)
+        count = len(fids)
+        if len(points) == 0:
+            empty = (np.empty((0, 2)), np.empty((0, 2)), np.zeros(count))
+            return empty + (np.full(count, np.nan), np.full(count, np.nan)) if directions else empty
+
+        # odcinki między kolejnymi punktami tej samej części
+        segments = np.hypot(*(points[1:] - points[:-1]).T)
+        same_part = record_of_point[1:] == record_of_point[:-1]
+        same_part[part_starts[part_starts > 0] - 1] = False
+        length = np.bincount(record_of_point[1:][same_part], weights=segments[same_part], minlength=count)
+
+        first = np.searchsorted(record_of_point, np.arange(count), 'left')
+        last = np.searchsorted(record_of_point, np.arange(count), 'right') - 1
+        empty = last < first  # obiekty bez punktów dostają współrzędne nan
+        points = np.vstack([points, [np.nan, np.nan]])
+        first[empty] = len(points) - 1
+        last[empty] = len(points) - 1
+        if not directions:
+            return points[first], points[last], length
+
+        single = first >= last  # linie z jednym punktem (i puste) nie mają kierunku
+        start = points[np.where(single, len(points) - 1, first + 1)] - points[first]
+        end = points[last] - points[np.where(single, len(points) - 1, last - 1)]
+        with np.errstate(invalid='ignore'):
+            start_direction = np.where(np.hypot(*start.T) > 0, np.arctan2(start[:, 1], start[:, 0]), np.nan)
+            end_direction = np.where(np.hypot(*end.T) > 0, np.arctan2(end[:, 1], end[:, 0]), np.nan)
+        return points[first], points[last], length, start_direction, end_direction
+
+    # Opis pól tabeli atrybutów .dbf: lista (nazwa, typ, położenie w rekordzie, długość)
+    def fields(self) -> list:
+        if self._fields is None:
+            self._fields = []
+            if self.dbf_path is not None:
+                with open(self.dbf_path, 'rb') as dbf:
+                    header = dbf.read(32)
+                    self._dbf_count = int(np.frombuffer(header[4:8], '<u4')[0])
+                    self._dbf_header = int(np.frombuffer(header[8:10], '<u2')[0])
+                    self._dbf_record = int(np.frombuffer(header[10:12], '<u2')[0])
+                    position = 1  # pierwszy bajt rekordu to znacznik usunięcia
+                    descriptor = dbf.read(32)
+                    while descriptor and descriptor[0] != 0x0D:
+                        name = descriptor[:11].split(b'\x00')[0].decode('ascii')
+                        self._fields.append((name, chr(descriptor[11]), position, descriptor[16]))
+                        position += descriptor[16]
+                        descriptor = dbf.read(32)
+        return self._fields
+
+    # Kolumny atrybutów dla wybranych obiektów; brakujące pola (lub brak pliku .dbf) dają None
+    def read_attributes(self, names: list, fids=None) -> dict:
+        fids = self._fids(fids)
+        fields = {field[0]: field for field in self.fields()}
+        result = dict()
+        records = None
+        if fields:
+            records = np.memmap(self.dbf_path, dtype=np.uint8, mode='r', offset=self._dbf_header,
+                                shape=(self._dbf_count, self._dbf_record))[fids]
+
+        for name in names:
+            if name not in fields:
+                result[name] = None
+                continue
+            _, kind, position, size = fields[name]
+            raw = np.ascontiguousarray(records[:, position:position + size]).view(f'S{size}').ravel()
+            if kind in 'NF':
+                values = np.array([value.strip() or b'nan' for value in raw.tolist()]).astype(np.float64)
+            else:
+                values = np.array([value.decode(self.encoding, 'replace').strip() for value in raw.tolist()],
+                                  dtype=object)
+            result[name] = values
+        return result
+
+    # Nagłówek .dbf (z opisem pól) i surowe rekordy wybranych obiektów - do przepisania atrybutów
+    # do innej warstwy; (None, None), jeśli warstwa nie ma tabeli atrybutów
+    def dbf_records(self, fids=None):
+        if not self.fields():
+            return None, None
+        with open(self.dbf_path, 'rb') as dbf:
+            header = dbf.read(self._dbf_header)
+        records = np.memmap(self.dbf_path, dtype=np.uint8, mode='r', offset=self._dbf_header,
+                            shape=(self._dbf_count, self._dbf_record))[self._fids(fids)]
+        return header, records
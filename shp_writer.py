@@ -0,0 +1,205 @@
+import json
+import os
+import shutil
+import sqlite3
+import struct
+import numpy as np
+
+from shp_reader import ShapefileReader
+
+DRIVERS = ('shp', 'geojson', 'gpkg')
+GPKG_SRS_ID = 2180  # ETRS89 / Poland CS92 - układ danych BDOT10k
+
+# Zapis warstw wynikowych bez arcpy. Warstwy podaje się jako słownik nazwa -> lista krawędzi
+# (obiekty Edge albo numery FID), a potrzebne obiekty warstwy źródłowej odczytywane są raz,
+# przez indeks .shx, wspólnie dla wszystkich warstw - zamiast przeglądania całej warstwy dla każdej trasy.
+
+def _fids(edges) -> list:
+    fids = dict()  # zachowuje kolejność krawędzi trasy, każdy obiekt raz
+    for edge in edges:
+        for fid in getattr(edge, 'fids', [edge]):  # krawędź scalona z kilku odcinków - wszystkie jej obiekty
+            fids.setdefault(int(fid), None)
+    return list(fids)
+
+# Części linii (tablice punktów (N, 2)) każdego z obiektów
+def _geometries(reader: ShapefileReader, fids) -> list:
+    record_of_point, part_starts, points = reader.read_points(fids)
+    bounds = np.append(part_starts, len(points))
+    part_records = record_of_point[part_starts] if len(points) else part_starts
+    geometries = [[] for _ in range(len(fids))]
+    for record, start, end in zip(part_records.tolist(), bounds[:-1].tolist(), bounds[1:].tolist()):
+        geometries[record].append(points[start:end])
+    return geometries
+
+SRC_FID_FIELD = struct.pack('<11sc4xBB14x', b'SRC_FID', b'N', 10, 0)  # deskryptor pola numeru obiektu źródłowego
+
+# Nagłówek .dbf z dopisanym na końcu polem SRC_FID (długości nagłówka i rekordu zwiększone);
+# opisy pól zaczynają się od bajtu 32 i kończą znacznikiem 0x0D
+def _dbf_header_with_src_fid(header: bytes) -> bytes:
+    end = 32
+    while header[end] != 0x0D:
+        end += 32
+    header_length, record_length = struct.unpack('<HH', header[8:12])
+    return header[:8] + struct.pack('<HH', header_length + 32, record_length + 10) + header[12:end] + \
+        SRC_FID_FIELD + header[end:]
+
+def write_shp(reader: ShapefileReader, path: str, fids: list, geometries: list, header: bytes, records):
+    base = os.path.splitext(path)[0]
+    contents = [reader.record_bytes(fid) for fid in fids]
+    coords = [part for parts in geometries for part in parts]
+    if coords:
+        coords = np.vstack(coords)
+        bbox = (coords[:, 0].min(), coords[:, 1].min(), coords[:, 0].max(), coords[:, 1].max())
+    else:
+        bbox = (0.0, 0.0, 0.0, 0.0)
+    z_m = reader.data[68:100].tobytes()  # zakresy Z i M jak w warstwie źródłowej
+
+    def file_header(words):
+        return struct.pack('>7i', 9994, 0, 0, 0, 0, 0, words) + struct.pack('<2i4d', 1000, reader.shape_type, *bbox) + z_m
+
+    shp_words = 50 + sum(4 + len(content) // 2 for content in contents)
+    with open(base + '.shp', 'wb') as shp, open(base + '.shx', 'wb') as shx:
+        shp.write(file_header(shp_words))
+        shx.write(file_header(50 + 4 * len(contents)))
+        offset = 50
+        for number, content in enumerate(contents, 1):
+            shp.write(struct.pack('>2i', number, len(content) // 2))
+            shp.write(content)
+            shx.write(struct.pack('>2i', offset, len(content) // 2))
+            offset += 4 + len(content) // 2
+
+    # atrybuty warstwy źródłowej i numer obiektu źródłowego SRC_FID jako ostatnie pole, jak w geojson i gpkg
+    with open(base + '.dbf', 'wb') as dbf:
+        if header is None:  # warstwa bez atrybutów - tylko znacznik usunięcia przed SRC_FID
+            header = struct.pack('<4BIHH20x', 3, 124, 1, 1, 0, 33, 1) + b'\x0d'
+            records = [b' '] * len(fids)
+        header = _dbf_header_with_src_fid(header)
+        dbf.write(header[:4] + struct.pack('<I', len(fids)) + header[8:])
+        for record, fid in zip(records, fids):
+            dbf.write(bytes(record) + str(fid).rjust(10).encode('ascii'))
+        dbf.write(b'\x1a')
+
+    for ext in ('.prj', '.cpg'):
+        source = os.path.splitext(reader.path)[0] + ext
+        if os.path.exists(source):
+            shutil.copyfile(source, base + ext)
+
+def _properties(fields: list, attributes: dict, fid: int, row: int) -> dict:
+    properties = {'SRC_FID': fid}
+    for name, _, _, _ in fields:
+        value = attributes[name][row]
+        if isinstance(value, float):
+            value = None if np.isnan(value) else (int(value) if value.is_integer() else value)
+        properties[name] = value
+    return properties
+
+def write_geojson(path: str, fids: list, geometries: list, fields: list, attributes: dict):
+    features = []
+    for row, (fid, parts) in enumerate(zip(fids, geometries)):
+        lines = [part.tolist() for part in parts]
+        geometry = {'type': 'LineString', 'coordinates': lines[0]} if len(lines) == 1 else \
+                   {'type': 'MultiLineString', 'coordinates': lines}
+        features.append({'type': 'Feature', 'id': fid, 'geometry': geometry,
+                         'properties': _properties(fields, attributes, fid, row)})
+    # współrzędne w układzie warstwy źródłowej (nie WGS84)
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump({'type': 'FeatureCollection', 'features': features}, file, ensure_ascii=False)
+
+# Geometria GeoPackage: nagłówek GP z prostokątem ograniczającym i WKB MultiLineString
+def _gpkg_geometry(parts: list, srs_id: int) -> bytes:
+    coords = np.vstack(parts) if parts else np.zeros((1, 2))
+    envelope = (coords[:, 0].min(), coords[:, 0].max(), coords[:, 1].min(), coords[:, 1].max())
+    wkb = struct.pack('<BII', 1, 5, len(parts))
+    for part in parts:
+        wkb += struct.pack('<BII', 1, 2, len(part)) + np.ascontiguousarray(part, dtype='<f8').tobytes()
+    return b'GP' + struct.pack('<BBi4d', 0, 0x03, srs_id, *envelope) + wkb
+
+def write_gpkg(reader: ShapefileReader, path: str, layers: dict, fields: list, attributes: dict, rows: dict,
+               geometries: list, srs_id: int = GPKG_SRS_ID):
+    if os.path.exists(path):
+        os.remove(path)
+    prj = os.path.splitext(reader.path)[0] + '.prj'
+    definition = 'undefined'
+    if os.path.exists(prj):
+        with open(prj) as file:
+            definition = file.read()
+    columns = ''.join(f', "{name}" {"REAL" if kind in "NF" else "TEXT"}' for name, kind, _, _ in fields)
+    names = ''.join(f', "{name}"' for name, _, _, _ in fields)
+
+    db = sqlite3.connect(path)
+    with db:
+        db.execute('PRAGMA application_id = 1196444487')  # 'GPKG'
+        db.execute('PRAGMA user_version = 10200')
+        db.execute('CREATE TABLE gpkg_spatial_ref_sys (srs_name TEXT NOT NULL, srs_id INTEGER PRIMARY KEY, '
+                   'organization TEXT NOT NULL, organization_coordsys_id INTEGER NOT NULL, '
+                   'definition TEXT NOT NULL, description TEXT)')
+        db.executemany('INSERT INTO gpkg_spatial_ref_sys VALUES (?, ?, ?, ?, ?, ?)', [
+            ('Undefined cartesian SRS', -1, 'NONE', -1, 'undefined', None),
+            ('Undefined geographic SRS', 0, 'NONE', 0, 'undefined', None),
+            ('WGS 84 geodetic', 4326, 'EPSG', 4326, 'GEOGCS["WGS 84",DATUM["WGS_1984",SPHEROID["WGS 84",'
+             '6378137,298.257223563]],PRIMEM["Greenwich",0],UNIT["degree",0.0174532925199433]]', None),
+        ] + ([] if srs_id in (-1, 0, 4326) else [(os.path.basename(prj), srs_id, 'EPSG', srs_id, definition, None)]))
+        db.execute('CREATE TABLE gpkg_contents (table_name TEXT NOT NULL PRIMARY KEY, data_type TEXT NOT NULL, '
+                   'identifier TEXT UNIQUE, description TEXT DEFAULT \'\', last_change DATETIME NOT NULL '
+                   'DEFAULT (strftime(\'%Y-%m-%dT%H:%M:%fZ\', \'now\')), min_x DOUBLE, min_y DOUBLE, '
+                   'max_x DOUBLE, max_y DOUBLE, srs_id INTEGER)')
+        db.execute('CREATE TABLE gpkg_geometry_columns (table_name TEXT NOT NULL, column_name TEXT NOT NULL, '
+                   'geometry_type_name TEXT NOT NULL, srs_id INTEGER NOT NULL, z TINYINT NOT NULL, '
+                   'm TINYINT NOT NULL, PRIMARY KEY (table_name, column_name))')
+
+        for name, fids in layers.items():
+            db.execute(f'CREATE TABLE "{name}" (fid INTEGER PRIMARY KEY AUTOINCREMENT, geom MULTILINESTRING, '
+                       f'"SRC_FID" INTEGER{columns})')
+            values = []
+            coords = []
+            for fid in fids:
+                row = rows[fid]
+                properties = _properties(fields, attributes, fid, row)
+                values.append([_gpkg_geometry(geometries[row], srs_id)] + list(properties.values()))
+                coords.extend(geometries[row])
+            marks = ', '.join('?' * (2 + len(fields)))
+            db.executemany(f'INSERT INTO "{name}" (geom, "SRC_FID"{names}) VALUES ({marks})', values)
+            coords = np.vstack(coords) if coords else np.zeros((1, 2))
+            db.execute('INSERT INTO gpkg_contents (table_name, data_type, identifier, min_x, min_y, max_x, max_y, '
+                       'srs_id) VALUES (?, \'features\', ?, ?, ?, ?, ?, ?)',
+                       (name, name, coords[:, 0].min(), coords[:, 1].min(), coords[:, 0].max(), coords[:, 1].max(),
+                        srs_id))
+            db.execute('INSERT INTO gpkg_geometry_columns VALUES (?, \'geom\', \'MULTILINESTRING\', ?, 0, 0)',
+                       (name, srs_id))
+    db.close()
+
+# Zapis kilku warstw wynikowych w jednym przebiegu. driver: 'shp' i 'geojson' - pliki <nazwa warstwy>
+# w katalogu out_path, 'gpkg' - wszystkie warstwy jako tabele jednego pliku out_path.
+# Zwraca listę zapisanych plików.
+def write_layers(shp_path: str, layers: dict, out_path: str, driver: str = 'shp') -> list:
+    if driver not in DRIVERS:
+        raise ValueError(f"Nieznany format zapisu {driver}.")
+    reader = ShapefileReader(shp_path)
+    layers = {name: _fids(edges) for name, edges in layers.items()}
+
+    # obiekty potrzebne w którejkolwiek warstwie, odczytywane raz
+    needed = sorted(set(fid for fids in layers.values() for fid in fids))
+    rows = {fid: row for row, fid in enumerate(needed)}
+    geometries = _geometries(reader, needed)
+    fields = reader.fields()
+    attributes = reader.read_attributes([field[0] for field in fields], needed) if driver != 'shp' else None
+    header, records = reader.dbf_records(needed) if driver == 'shp' else (None, None)
+
+    if driver == 'gpkg':
+        write_gpkg(reader, out_path, layers, fields, attributes, rows, geometries)
+        return [out_path]
+
+    os.makedirs(out_path, exist_ok=True)
+    paths = []
+    for name, fids in layers.items():
+        selected = [rows[fid] for fid in fids]
+        if driver == 'shp':
+            path = os.path.join(out_path, name + '.shp')
+            write_shp(reader, path, fids, [geometries[row] for row in selected], header,
+                      None if records is None else records[selected])
+        else:
+            path = os.path.join(out_path, name + '.geojson')
+            layer_attributes = {key: values[selected] for key, values in attributes.items()}
+            write_geojson(path, fids, [geometries[row] for row in selected], fields, layer_attributes)
+        paths.append(path)
+    return paths
@@ -0,0 +1,209 @@
+import math
+import numpy as np
+
+from snapping import SnapIndex
+
+ROAD_COLUMNS = ("fid", "start", "end", "length", "time_cost", "kat_zarzad", "klasa_drog", "oneway", "start_bearing",
+                "end_bearing")
+
+# Czyszczenie topologii warstwy dróg (słownik tablic z loader.read_roads) przed budową grafu:
+# - usunięcie pętli (oba końce przyciągane do tego samego węzła) - nie leżą na żadnej najkrótszej trasie,
+# - usunięcie duplikatów (te same węzły końcowe i kierunek, długość różna o nie więcej niż tolerancja),
+# - usunięcie krótkich zwisów (dangle_length, m): odcinków od skrzyżowania do węzła bez innych dróg,
+# - scalenie łańcuchów węzłów stopnia 2 w jedną krawędź; scalane są tylko odcinki o tych samych
+#   atrybutach (kat_zarzad, klasa_drog) i zgodnym kierunku, więc profile kosztów liczą się bez zmian.
+# Wynik ma dodatkową kolumnę fids - numery obiektów warstwy źródłowej w kolejności jazdy, dzięki której
+# zapis trasy (shp_writer.write_layers, functions.save_shp) eksportuje dokładnie te same odcinki - oraz
+# kolumnę shares z udziałem każdego z nich w czasie przejazdu (do zmian kosztu odcinka w Graph.update_road).
+# Węzły z keep (współrzędne, np. punkty startu i celu) nie są usuwane przy scalaniu.
+def simplify_roads(roads: dict, tolerance: float = 1, dangle_length: float = 3.0, keep=()) -> tuple:
+    columns = {name: roads[name].tolist() for name in ROAD_COLUMNS}
+    count = len(columns["fid"])
+
+    # przyciąganie końców w tej samej kolejności co Graph.add_edge - te same węzły kanoniczne
+    index = SnapIndex(tolerance)
+
+    def snap(coords):
+        node = index.find(coords)
+        if node is None:
+            node = coords
+            index.insert(coords, node)
+        return node
+
+    u, v, direction = [], [], []  # kierunek: 0 - dwukierunkowa, 1 - tylko u -> v, None - nieprzejezdna
+    for start, end, oneway in zip(columns["start"], columns["end"], columns["oneway"]):
+        a, b = snap(tuple(start)), snap(tuple(end))
+        if oneway == 2:
+            a, b = b, a
+        u.append(a)
+        v.append(b)
+        direction.append(0 if oneway == 0 else 1 if oneway in (1, 2) else None)
+    keep = {node for node in (index.find(tuple(coords)) for coords in keep) if node is not None}
+    report = {"nodes_before": len(index), "edges_before": sum(_directed(d) for d in direction),
+              "segments_before": count}
+
+    alive = [a != b for a, b in zip(u, v)]
+    report["removed_loops"] = count - sum(alive)
+    attributes = list(zip(columns["kat_zarzad"], columns["klasa_drog"]))
+    report["removed_duplicates"] = _drop_duplicates(alive, u, v, direction, columns["length"], attributes, tolerance)
+
+    # zwisy: krótki odcinek, którego jeden koniec nie łączy się z niczym, a drugi jest skrzyżowaniem
+    degree = dict()
+    for i in range(count):
+        if alive[i]:
+            degree[u[i]] = degree.get(u[i], 0) + 1
+            degree[v[i]] = degree.get(v[i], 0) + 1
+    removed_dangles = 0
+    for i in range(count):
+        if alive[i] and columns["length"][i] < dangle_length:
+            ends = sorted((degree[u[i]], degree[v[i]]))
+            free = u[i] if degree[u[i]] == 1 else v[i]
+            if ends[0] == 1 and ends[1] >= 3 and free not in keep:
+                alive[i] = False
+                removed_dangles += 1
+    report["removed_dangles"] = removed_dangles
+
+    incident = dict()  # węzeł -> żywe odcinki, które się w nim kończą
+    for i in range(count):
+        if alive[i]:
+            incident.setdefault(u[i], []).append(i)
+            incident.setdefault(v[i], []).append(i)
+
+    # węzeł pośredni łańcucha: dokładnie dwa odcinki do różnych sąsiadów, te same atrybuty i przejazd na wprost
+    def passes(node) -> bool:
+        segments = incident[node]
+        if node in keep or len(segments) != 2:
+            return False
+        s, t = segments
+        if direction[s] is None or direction[s] != direction[t]:
+            return False
+        if (columns["kat_zarzad"][s], columns["klasa_drog"][s]) != (columns["kat_zarzad"][t], columns["klasa_drog"][t]):
+            return False
+        if (u[s] if v[s] == node else v[s]) == (u[t] if v[t] == node else v[t]):
+            return False
+        return direction[s] == 0 or (v[s] == node) != (v[t] == node)  # jednokierunkowe: jeden wjazd i jeden wyjazd
+    through = {node: passes(node) for node in incident}
+
+    rows = []  # (odcinki łańcucha w kolejności jazdy, węzeł początkowy, węzeł końcowy)
+    consumed = [False] * count
+    merged_chains = 0
+    for i in range(count):
+        if not alive[i] or consumed[i]:
+            continue
+        consumed[i] = True
+        chain, first, last, cycle = [i], u[i], v[i], False
+        for forward in (True, False):
+            node, previous = (last, i) if forward else (first, i)
+            while through[node]:
+                s, t = incident[node]
+                segment = t if s == previous else s
+                if consumed[segment]:  # zamknięty łańcuch bez skrzyżowań - zostaje bez zmian
+                    cycle = True
+                    break
+                consumed[segment] = True
+                node = v[segment] if u[segment] == node else u[segment]
+                previous = segment
+                if forward:
+                    chain.append(segment)
+                else:
+                    chain.insert(0, segment)
+            if cycle:
+                break
+            if forward:
+                last = node
+            else:
+                first = node
+
+        if cycle:
+            rows.extend(([segment], None, None) for segment in chain)
+        elif len(chain) == 1:
+            rows.append((chain, None, None))
+        elif first == last:  # łańcuch wracający do tego samego skrzyżowania
+            report["removed_loops"] += len(chain)
+        else:
+            rows.append((chain, first, last))
+            merged_chains += 1
+
+    result = {name: [] for name in ROAD_COLUMNS}
+    result["fids"] = []
+    result["shares"] = []
+    for chain, first, last in rows:
+        if first is None:
+            i = chain[0]
+            for name in ROAD_COLUMNS:
+                result[name].append(columns[name][i])
+            result["start"][-1] = u[i] if columns["oneway"][i] != 2 else v[i]  # współrzędne węzłów kanonicznych
+            result["end"][-1] = v[i] if columns["oneway"][i] != 2 else u[i]
+            result["fids"].append([columns["fid"][i]])
+            result["shares"].append([1.0])
+            continue
+        i = chain[0]
+        result["fid"].append(columns["fid"][i])
+        result["start"].append(first)
+        result["end"].append(last)
+        result["length"].append(sum(columns["length"][s] for s in chain))
+        result["time_cost"].append(sum(columns["time_cost"][s] for s in chain))
+        result["kat_zarzad"].append(columns["kat_zarzad"][i])
+        result["klasa_drog"].append(columns["klasa_drog"][i])
+        result["oneway"].append(direction[i])
+        result["fids"].append([columns["fid"][s] for s in chain])
+        total = sum(columns["time_cost"][s] for s in chain)
+        result["shares"].append([columns["time_cost"][s] / total if total else 1 / len(chain) for s in chain])
+        # kierunki końców łańcucha w kierunku jazdy; odcinek przechodzony pod prąd geometrii ma kierunki odwrócone
+        bearings = []
+        node = first
+        for s in chain:
+            along = (v[s] if columns["oneway"][s] == 2 else u[s]) == node
+            start, end = columns["start_bearing"][s], columns["end_bearing"][s]
+            bearings.append((start, end) if along else (end + math.pi, start + math.pi))
+            node = v[s] if u[s] == node else u[s]
+        result["start_bearing"].append(bearings[0][0])
+        result["end_bearing"].append(bearings[-1][1])
+
+    alive = [True] * len(result["fid"])
+    report["removed_duplicates"] += _drop_duplicates(
+        alive, [tuple(p) for p in result["start"]], [tuple(p) for p in result["end"]],
+        [0 if oneway == 0 else 1 if oneway in (1, 2) else None for oneway in result["oneway"]],
+        result["length"], list(zip(result["kat_zarzad"], result["klasa_drog"])), tolerance, reverse=[oneway == 2 for oneway in result["oneway"]])
+
+    simplified = dict()
+    for name, values in result.items():
+        values = [value for value, ok in zip(values, alive) if ok]
+        if name in ("fids", "shares"):
+            array = np.empty(len(values), dtype=object)
+            array[:] = values
+        else:
+            array = np.array(values, dtype=roads[name].dtype).reshape((-1,) + roads[name].shape[1:])
+        simplified[name] = array
+
+    nodes = {tuple(p) for p in simplified["start"].tolist()} | {tuple(p) for p in simplified["end"].tolist()}
+    report.update({"nodes_after": len(nodes),
+                   "edges_after": sum(_directed(oneway) for oneway in simplified["oneway"].tolist()),
+                   "segments_after": len(simplified["fid"]), "merged_chains": merged_chains})
+    report["node_reduction"] = 1 - report["nodes_after"] / report["nodes_before"] if report["nodes_before"] else 0
+    report["edge_reduction"] = 1 - report["edges_after"] / report["edges_before"] if report["edges_before"] else 0
+    return simplified, report
+
+# Liczba krawędzi skierowanych, które Graph.add_edge tworzy dla wartości ONEWAY
+def _directed(oneway) -> int:
+    return 2 if oneway == 0 else 1 if oneway in (1, 2) else 0
+
+# Oznaczenie duplikatów (te same węzły, kierunek i atrybuty) jako usuniętych (alive[i] = False);
+# z powtarzających się odcinków zostaje najkrótszy. reverse[i] - odcinek zapisany przeciwnie do kierunku jazdy (ONEWAY=2)
+def _drop_duplicates(alive: list, u: list, v: list, direction: list, length: list, attributes: list,
+                     tolerance: float, reverse: list = None) -> int:
+    seen = dict()
+    removed = 0
+    for i in range(len(alive)):
+        if not alive[i] or direction[i] is None:
+            continue
+        a, b = (v[i], u[i]) if reverse is not None and reverse[i] else (u[i], v[i])
+        key = ((a, b, 1) if direction[i] == 1 else (min(a, b), max(a, b), 0)) + attributes[i]
+        j = seen.setdefault(key, i)
+        if j != i and abs(length[i] - length[j]) <= tolerance:
+            if length[i] < length[j]:
+                i, j = j, i
+                seen[key] = j
+            alive[i] = False
+            removed += 1
+    return removed
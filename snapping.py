@@ -0,0 +1,52 @@
+import math
+import numpy as np
+
+# Indeks siatkowy (grid-hash) do przyciągania końców krawędzi do istniejących wierzchołków.
+# Punkt jest utożsamiany z wierzchołkiem, jeśli |dx| <= tolerance oraz |dy| <= tolerance
+# (dla tolerancji 1 odpowiada to dawnemu sprawdzaniu generate_4_ids).
+class SnapIndex:
+    def __init__(self, tolerance: float = 1):
+        self.tolerance = tolerance
+        self.cell_size = tolerance if tolerance > 0 else 1
+        self.points = dict()  # klucze to współrzędne, wartości to przechowywane obiekty
+        self.cells = dict()  # klucze to komórki siatki, wartości to listy (współrzędne, obiekt)
+
+    def _cell(self, coords: tuple) -> tuple:
+        return (math.floor(coords[0] / self.cell_size), math.floor(coords[1] / self.cell_size))
+
+    # Zwraca obiekt najbliższy punktowi w granicach tolerancji albo None
+    def find(self, coords: tuple):
+        value = self.points.get(coords)
+        if value is not None or self.tolerance == 0:  # najczęstszy przypadek - identyczne współrzędne
+            return value
+
+        (x, y) = coords
+        (cx, cy) = self._cell(coords)
+        best = None
+        best_dist = float('inf')
+        for dx in (-1, 0, 1):  # przy komórce o boku równym tolerancji wystarczy sąsiedztwo 3x3
+            for dy in (-1, 0, 1):
+                for (px, py), candidate in self.cells.get((cx + dx, cy + dy), ()):
+                    if abs(px - x) <= self.tolerance and abs(py - y) <= self.tolerance:
+                        dist = (px - x) ** 2 + (py - y) ** 2
+                        if dist < best_dist:
+                            best = candidate
+                            best_dist = dist
+        return best
+
+    def insert(self, coords: tuple, value):
+        self.points[coords] = value
+        if self.tolerance > 0:
+            self.cells.setdefault(self._cell(coords), []).append((coords, value))
+
+    # Wstawienie wielu punktów naraz (np. węzłów ze zrzutu grafu) - komórki liczone wektorowo
+    def insert_many(self, coords: list, values: list):
+        self.points.update(zip(coords, values))
+        if self.tolerance > 0 and coords:
+            xy = np.floor(np.asarray(coords, dtype=np.float64) / self.cell_size).astype(np.int64)
+            cells = self.cells
+            for cell, item in zip(map(tuple, xy.tolist()), zip(coords, values)):
+                cells.setdefault(cell, []).append(item)
+
+    def __len__(self):
+        return len(self.points)
@@ -0,0 +1,156 @@
+import math
+import numpy as np
+
+# Indeks przestrzenny (regularna siatka) nad węzłami i krawędziami grafu, budowany raz
+# i odpytywany wsadowo. Wyszukiwanie najbliższego obiektu przegląda kolejne "pierścienie"
+# komórek wokół punktu jednocześnie dla wszystkich punktów: obiekt spoza pierścieni 0..r
+# leży co najmniej r * cell_size od punktu, więc wynik jest pewny, gdy best <= r * cell_size.
+class SpatialIndex:
+    def __init__(self, graph, cell_size: float = None):
+        self.graph = graph
+        self.keys = list(graph.nodes.keys())
+        self.nodes = list(graph.nodes.values())
+        self.x = np.array([node.x for node in self.nodes], dtype=np.float64)
+        self.y = np.array([node.y for node in self.nodes], dtype=np.float64)
+
+        self.x0 = self.x.min()
+        self.y0 = self.y.min()
+        width = max(self.x.max() - self.x0, 1)
+        height = max(self.y.max() - self.y0, 1)
+        # domyślnie około dwóch węzłów na komórkę
+        self.cell_size = cell_size or max(math.sqrt(2 * width * height / len(self.nodes)), 1)
+        self.nx = int(width // self.cell_size) + 1
+        self.ny = int(height // self.cell_size) + 1
+
+        self._node_cells = self._sorted_cells(self._cell_id(*self._cells(self.x, self.y)), np.arange(len(self.nodes)))
+        self._edge_cells = None  # indeks krawędzi budowany przy pierwszym użyciu snap_to_edges
+
+    def _cells(self, x, y):
+        return (np.floor((x - self.x0) / self.cell_size).astype(np.int64),
+                np.floor((y - self.y0) / self.cell_size).astype(np.int64))
+
+    def _cell_id(self, cx, cy):
+        return cx * self.ny + cy
+
+    # Posortowane identyfikatory komórek i odpowiadające im numery obiektów
+    @staticmethod
+    def _sorted_cells(cell_ids, items):
+        order = np.argsort(cell_ids, kind='stable')
+        return cell_ids[order], items[order]
+
+    def _build_edge_cells(self):
+        edges = dict()  # każda krawędź raz, niezależnie od liczby kierunków
+        for node in self.nodes:
+            for edge in node.edges_out:
+                edges.setdefault(edge.id, edge)
+        self.edges = list(edges.values())
+        self.ax = np.array([edge.id_from[0] for edge in self.edges], dtype=np.float64)
+        self.ay = np.array([edge.id_from[1] for edge in self.edges], dtype=np.float64)
+        self.bx = np.array([edge.id_to[0] for edge in self.edges], dtype=np.float64)
+        self.by = np.array([edge.id_to[1] for edge in self.edges], dtype=np.float64)
+
+        # odcinek rejestrowany jest we wszystkich komórkach swojego prostokąta ograniczającego
+        cx0, cy0 = self._cells(np.minimum(self.ax, self.bx), np.minimum(self.ay, self.by))
+        cx1, cy1 = self._cells(np.maximum(self.ax, self.bx), np.maximum(self.ay, self.by))
+        cell_ids, items = [], []
+        for i, (x0, y0, x1, y1) in enumerate(zip(cx0.tolist(), cy0.tolist(), cx1.tolist(), cy1.tolist())):
+            for cx in range(x0, x1 + 1):
+                for cy in range(y0, y1 + 1):
+                    cell_ids.append(cx * self.ny + cy)
+                    items.append(i)
+        self._edge_cells = self._sorted_cells(np.array(cell_ids, dtype=np.int64), np.array(items, dtype=np.int64))
+
+    # Wsadowe wyszukiwanie najbliższego obiektu; distance(zapytania, obiekty) liczy odległości wektorowo
+    def _nearest(self, px, py, cells, distance):
+        sorted_cells, cell_items = cells
+        qcx, qcy = self._cells(px, py)
+        best = np.full(len(px), np.inf)
+        best_item = np.full(len(px), -1, dtype=np.int64)
+        active = np.arange(len(px))
+        r = 0
+
+        while active.size:
+            if r == 0:
+                ring = [(0, 0)]
+            else:
+                ring = [(dx, dy) for dx in range(-r, r + 1) for dy in (-r, r)] + \
+                       [(dx, dy) for dx in (-r, r) for dy in range(-r + 1, r)]
+            for dx, dy in ring:
+                cx = qcx[active] + dx
+                cy = qcy[active] + dy
+                valid = (cx >= 0) & (cx < self.nx) & (cy >= 0) & (cy < self.ny)
+                queries = active[valid]
+                cell_ids = self._cell_id(cx[valid], cy[valid])
+                lo = np.searchsorted(sorted_cells, cell_ids, 'left')
+                counts = np.searchsorted(sorted_cells, cell_ids, 'right') - lo
+                total = counts.sum()
+                if total == 0:
+                    continue
+
+                # rozwinięcie zakresów [lo, lo + count) do płaskiej listy par (zapytanie, obiekt)
+                starts = np.repeat(lo - np.cumsum(counts) + counts, counts)
+                query_rep = np.repeat(queries, counts)
+                items = cell_items[np.arange(total) + starts]
+                dist = distance(query_rep, items)
+
+                order = np.lexsort((dist, query_rep))  # najmniejsza odległość na początku grupy zapytania
+                first = np.ones(len(order), dtype=bool)
+                first[1:] = query_rep[order][1:] != query_rep[order][:-1]
+                q = query_rep[order][first]
+                d = dist[order][first]
+                better = d < best[q]
+                best[q[better]] = d[better]
+                best_item[q[better]] = items[order][first][better]
+
+            qa_x, qa_y = qcx[active], qcy[active]
+            done = best[active] <= r * self.cell_size
+            # pierścień obejmuje już całą siatkę
+            done |= (qa_x - r <= 0) & (qa_x + r >= self.nx - 1) & (qa_y - r <= 0) & (qa_y + r >= self.ny - 1)
+            active = active[~done]
+            r += 1
+
+        return best_item, best
+
+    def _points(self, points):
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        return points[:, 0], points[:, 1]
+
+    # Indeksy (w kolejności Graph.nodes) i odległości węzłów najbliższych podanym punktom
+    def nearest(self, points):
+        px, py = self._points(points)
+
+        def distance(queries, items):
+            return np.hypot(self.x[items] - px[queries], self.y[items] - py[queries])
+
+        return self._nearest(px, py, self._node_cells, distance)
+
+    # Klucze graph.nodes węzłów najbliższych podanym punktom
+    def snap(self, points) -> list:
+        items, _ = self.nearest(points)
+        return [self.keys[i] for i in items.tolist()]
+
+    # Przyciąganie do najbliższego punktu na krawędzi (odcinek między węzłami krawędzi);
+    # zwraca listę (krawędź, rzut punktu na krawędź, położenie rzutu jako ułamek długości 0..1)
+    def snap_to_edges(self, points) -> list:
+        if self._edge_cells is None:
+            self._build_edge_cells()
+        px, py = self._points(points)
+
+        def fraction(queries, items):
+            dx = self.bx[items] - self.ax[items]
+            dy = self.by[items] - self.ay[items]
+            length2 = np.maximum(dx * dx + dy * dy, 1e-12)
+            t = ((px[queries] - self.ax[items]) * dx + (py[queries] - self.ay[items]) * dy) / length2
+            return np.clip(t, 0, 1), dx, dy
+
+        def distance(queries, items):
+            t, dx, dy = fraction(queries, items)
+            return np.hypot(self.ax[items] + t * dx - px[queries], self.ay[items] + t * dy - py[queries])
+
+        items, _ = self._nearest(px, py, self._edge_cells, distance)
+        t, dx, dy = fraction(np.arange(len(px)), items)
+        result = []
+        for i, item in enumerate(items.tolist()):
+            projection = (self.ax[item] + t[i] * dx[i], self.ay[item] + t[i] * dy[i])
+            result.append((self.edges[item], projection, float(t[i])))
+        return result
@@ -0,0 +1,304 @@
+import bisect
+import heapq
+import json
+import math
+import os
+import shutil
+from collections import OrderedDict
+import numpy as np
+
+from csr import MAX_SPEED
+from loader import read_roads
+from shp_reader import ShapefileReader
+from snapping import SnapIndex
+
+TILES_VERSION = 2
+
+# Strumieniowa budowa grafu podzielonego na kafle, dla sieci większych niż pamięć.
+# Warstwa czytana jest częściami po chunk_size obiektów, a dane pośrednie trafiają do plików
+# tymczasowych na dysku, więc w pamięci jest naraz tylko jedna część warstwy albo jeden kafel:
+#   1. końce linii zapisywane są do pliku kafla, w którym leżą;
+#   2. kafle przetwarzane są po kolei; węzły kafla przyciągane są z tolerancją, a do indeksu
+#      najpierw trafiają węzły już przetworzonych sąsiednich kafli leżące przy granicy (pas o szerokości
+#      tolerancji), dzięki czemu punkty po obu stronach granicy łączą się w jeden węzeł;
+#   3. krawędzie skierowane zapisywane są do kafla węzła początkowego i składane w tablice CSR
+#      (ze współrzędnymi węzła końcowego, żeby wyszukiwanie nie sięgało po nie do innych kafli).
+# Węzły mają globalne numery nadawane kolejno w kaflach, więc kafel węzła wynika z samego numeru.
+
+def _append(path: str, rows: np.ndarray):
+    with open(path, 'ab') as file:
+        file.write(np.ascontiguousarray(rows, dtype=np.int64).tobytes())
+
+def _read(path: str, columns: int) -> np.ndarray:
+    if not os.path.exists(path):
+        return np.empty((0, columns), dtype=np.int64)
+    return np.fromfile(path, dtype=np.int64).reshape(-1, columns)
+
+# Zapis wierszy do plików kafli: tiles[i] to kafel wiersza rows[i]
+def _spill(pattern: str, tiles: np.ndarray, rows: np.ndarray):
+    order = np.argsort(tiles, kind='stable')
+    tiles, rows = tiles[order], rows[order]
+    values, starts = np.unique(tiles, return_index=True)
+    for tile, start, end in zip(values.tolist(), starts.tolist(), np.append(starts[1:], len(tiles)).tolist()):
+        _append(pattern.format(tile), rows[start:end])
+
+def build_tiles(shp_path: str, out_dir: str, tile_size: float = 10000, chunk_size: int = 100000,
+                tolerance: float = 1) -> str:
+    if tolerance >= tile_size:
+        raise ValueError("Tolerancja przyciągania musi być mniejsza niż rozmiar kafla.")
+    reader = ShapefileReader(shp_path)
+    xmin, ymin, xmax, ymax = reader.bbox
+    x0, y0 = math.floor(xmin) - 1, math.floor(ymin) - 1  # współrzędne są zaokrąglane do metra
+    nx = int((xmax + 1 - x0) // tile_size) + 1
+    ny = int((ymax + 1 - y0) // tile_size) + 1
+    count = len(reader)
+
+    def tile_of(x, y):
+        return (np.floor((x - x0) / tile_size).astype(np.int64) * ny +
+                np.floor((y - y0) / tile_size).astype(np.int64))
+
+    temp = out_dir + '.tmp'
+    shutil.rmtree(temp, ignore_errors=True)
+    os.makedirs(os.path.join(temp, 'spill'))
+    spill = os.path.join(temp, 'spill')
+
+    # atrybuty i węzły końcowe obiektów według FID - tablice na dysku
+    def fid_array(name, dtype, fill):
+        array = np.lib.format.open_memmap(os.path.join(spill, name + '.npy'), 'w+', dtype, (count,))
+        array[:] = fill
+        return array
+
+    lengths = fid_array('length', np.float64, np.nan)
+    time_costs = fid_array('time_cost', np.float64, np.nan)
+    oneways = fid_array('oneway', np.int8, -1)  # -1 - obiekt bez geometrii
+    start_nodes = fid_array('start_node', np.int64, -1)
+    end_nodes = fid_array('end_node', np.int64, -1)
+
+    # Etap 1: końce linii do plików kafli (wiersze fid, koniec 0/1, x, y)
+    for begin in range(0, count, chunk_size):
+        roads = read_roads(shp_path, np.arange(begin, min(begin + chunk_size, count)), reader)
+        fid = roads['fid']
+        lengths[fid] = roads['length']
+        time_costs[fid] = roads['time_cost']
+        oneways[fid] = roads['oneway']
+        rows = np.vstack([np.column_stack([fid, np.zeros_like(fid), roads['start']]),
+                          np.column_stack([fid, np.ones_like(fid), roads['end']])])
+        _spill(os.path.join(spill, 'points_{}.bin'), tile_of(rows[:, 2], rows[:, 3]), rows)
+
+    # Etap 2: przyciąganie węzłów kafel po kaflu
+    first_node = [0]
+    for tile in range(nx * ny):
+        tx, ty = divmod(tile, ny)
+        tile_dir = os.path.join(temp, f'tile_{tile}')
+        os.makedirs(tile_dir)
+        snap_index = SnapIndex(tolerance)
+
+        # węzły przetworzonych już sąsiednich kafli w pasie tolerancji wokół kafla
+        left, bottom = x0 + tx * tile_size - tolerance, y0 + ty * tile_size - tolerance
+        right, top = left + tile_size + 2 * tolerance, bottom + tile_size + 2 * tolerance
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                neighbor = (tx + dx) * ny + ty + dy
+                if not (0 <= tx + dx < nx and 0 <= ty + dy < ny) or neighbor >= tile:
+                    continue
+                neighbor_dir = os.path.join(temp, f'tile_{neighbor}')
+                x = np.load(os.path.join(neighbor_dir, 'x.npy'))
+                y = np.load(os.path.join(neighbor_dir, 'y.npy'))
+                near = np.flatnonzero((x >= left) & (x <= right) & (y >= bottom) & (y <= top))
+                for i, coords in zip(near.tolist(), zip(x[near].tolist(), y[near].tolist())):
+                    snap_index.insert(coords, first_node[neighbor] + i)
+
+        points = _read(os.path.join(spill, f'points_{tile}.bin'), 4)
+        xs, ys = [], []
+        nodes = np.empty(len(points), dtype=np.int64)
+        for i, (x, y) in enumerate(points[:, 2:].tolist()):
+            node = snap_index.find((x, y))
+            if node is None:
+                node = first_node[tile] + len(xs)
+                xs.append(x)
+                ys.append(y)
+                snap_index.insert((x, y), node)
+            nodes[i] = node
+        is_end = points[:, 1] == 1
+        start_nodes[points[~is_end, 0]] = nodes[~is_end]
+        end_nodes[points[is_end, 0]] = nodes[is_end]
+        np.save(os.path.join(tile_dir, 'x.npy'), np.array(xs, dtype=np.int64))
+        np.save(os.path.join(tile_dir, 'y.npy'), np.array(ys, dtype=np.int64))
+        first_node.append(first_node[tile] + len(xs))
+
+    # Etap 3: krawędzie skierowane (węzeł początkowy, końcowy, FID) do kafla węzła początkowego
+    first = np.array(first_node, dtype=np.int64)
+    for begin in range(0, count, chunk_size):
+        fid = np.arange(begin, min(begin + chunk_size, count))
+        oneway = np.asarray(oneways[fid])
+        u, v = np.asarray(start_nodes[fid]), np.asarray(end_nodes[fid])
+        forward = (oneway == 0) | (oneway == 1)  # kierunkowość tak jak w Graph.add_edge
+        backward = (oneway == 0) | (oneway == 2)
+        rows = np.vstack([np.column_stack([u[forward], v[forward], fid[forward]]),
+                          np.column_stack([v[backward], u[backward], fid[backward]])])
+        _spill(os.path.join(spill, 'edges_{}.bin'), np.searchsorted(first, rows[:, 0], 'right') - 1, rows)
+
+    # Etap 4: tablice CSR kafli
+    edge_count = 0
+    for tile in range(nx * ny):
+        tile_dir = os.path.join(temp, f'tile_{tile}')
+        rows = _read(os.path.join(spill, f'edges_{tile}.bin'), 3)
+        order = np.argsort(rows[:, 0], kind='stable')
+        rows = rows[order]
+        offsets = np.zeros(first_node[tile + 1] - first_node[tile] + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows[:, 0] - first_node[tile], minlength=len(offsets) - 1), out=offsets[1:])
+        np.save(os.path.join(tile_dir, 'offsets.npy'), offsets)
+        np.save(os.path.join(tile_dir, 'targets.npy'), rows[:, 1])
+        target_x, target_y = np.empty(len(rows), dtype=np.int64), np.empty(len(rows), dtype=np.int64)
+        target_tiles = np.searchsorted(first, rows[:, 1], 'right') - 1
+        for target_tile in np.unique(target_tiles).tolist():
+            mask = target_tiles == target_tile
+            target_dir = os.path.join(temp, f'tile_{target_tile}')
+            target_x[mask] = np.load(os.path.join(target_dir, 'x.npy'))[rows[mask, 1] - first_node[target_tile]]
+            target_y[mask] = np.load(os.path.join(target_dir, 'y.npy'))[rows[mask, 1] - first_node[target_tile]]
+        np.save(os.path.join(tile_dir, 'target_x.npy'), target_x)
+        np.save(os.path.join(tile_dir, 'target_y.npy'), target_y)
+        np.save(os.path.join(tile_dir, 'edge_id.npy'), rows[:, 2])
+        np.save(os.path.join(tile_dir, 'length.npy'), np.asarray(lengths[rows[:, 2]]))
+        np.save(os.path.join(tile_dir, 'time_cost.npy'), np.asarray(time_costs[rows[:, 2]]))
+        edge_count += len(rows)
+
+    del lengths, time_costs, oneways, start_nodes, end_nodes
+    shutil.rmtree(spill)
+    with open(os.path.join(temp, 'manifest.json'), 'w') as file:
+        json.dump({'version': TILES_VERSION, 'x0': x0, 'y0': y0, 'tile_size': tile_size, 'nx': nx, 'ny': ny,
+                   'tolerance': tolerance, 'first_node': first_node, 'nodes': first_node[-1],
+                   'edges': edge_count}, file)
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(temp, out_dir)
+    return out_dir
+
+# Graf kafelkowy z build_tiles: kafle wczytywane są przy pierwszym odwołaniu do ich węzłów,
+# a w pamięci pozostaje co najwyżej max_tiles ostatnio używanych. Węzły to numery globalne,
+# a użyte krawędzie zwracane są jako FID obiektów warstwy (do zapisu przez shp_writer.write_layers).
+class TiledGraph:
+    def __init__(self, path: str, max_tiles: int = 64):
+        self.path = path
+        with open(os.path.join(path, 'manifest.json')) as file:
+            self.manifest = json.load(file)
+        if self.manifest.get('version') != TILES_VERSION:
+            raise ValueError(f"Nieobsługiwana wersja grafu kafelkowego {path}.")
+        self.first_node = self.manifest['first_node']
+        self.max_tiles = max_tiles
+        self._tiles = OrderedDict()
+        self.loads = 0  # liczba wczytań kafli (z ponownymi wczytaniami po usunięciu z pamięci)
+
+    @property
+    def node_count(self):
+        return self.manifest['nodes']
+
+    @property
+    def edge_count(self):
+        return self.manifest['edges']
+
+    def _tile(self, tile: int) -> dict:
+        data = self._tiles.get(tile)
+        if data is not None:
+            self._tiles.move_to_end(tile)
+            return data
+        tile_dir = os.path.join(self.path, f'tile_{tile}')
+        # listy zamiast tablic - szybszy odczyt pojedynczych wartości w pętli wyszukiwania
+        data = {name: np.load(os.path.join(tile_dir, name + '.npy')).tolist()
+                for name in ('x', 'y', 'offsets', 'targets', 'target_x', 'target_y', 'edge_id', 'length',
+                             'time_cost')}
+        self._tiles[tile] = data
+        self.loads += 1
+        if len(self._tiles) > self.max_tiles:
+            self._tiles.popitem(last=False)
+        return data
+
+    # Kafel węzła i numer węzła w kaflu
+    def _locate(self, v: int) -> tuple:
+        tile = bisect.bisect_right(self.first_node, v) - 1
+        return self._tile(tile), v - self.first_node[tile]
+
+    def coords(self, v: int) -> tuple:
+        data, i = self._locate(v)
+        return data['x'][i], data['y'][i]
+
+    # Numer węzła najbliższego podanym współrzędnym (przeszukiwane są kolejne pierścienie kafli)
+    def nearest_node(self, coords: tuple) -> int:
+        m = self.manifest
+        tx = int((coords[0] - m['x0']) // m['tile_size'])
+        ty = int((coords[1] - m['y0']) // m['tile_size'])
+        best, best_dist = None, float('inf')
+        for r in range(max(m['nx'], m['ny'])):
+            for cx in range(tx - r, tx + r + 1):
+                for cy in range(ty - r, ty + r + 1):
+                    if max(abs(cx - tx), abs(cy - ty)) != r or not (0 <= cx < m['nx'] and 0 <= cy < m['ny']):
+                        continue
+                    tile = cx * m['ny'] + cy
+                    if self.first_node[tile + 1] == self.first_node[tile]:
+                        continue
+                    data = self._tile(tile)
+                    dist = (np.array(data['x']) - coords[0]) ** 2 + (np.array(data['y']) - coords[1]) ** 2
+                    i = int(np.argmin(dist))
+                    if dist[i] < best_dist:
+                        best, best_dist = self.first_node[tile] + i, dist[i]
+            # węzły dalszych pierścieni leżą co najmniej r * tile_size od punktu
+            if best is not None and math.sqrt(best_dist) <= r * m['tile_size']:
+                break
+        return best
+
+    def _astar(self, a: int, b: int, cost: str, speed: float):
+        bx, by = self.coords(b)
+
+        def heuristic(x, y):
+            if speed == 0:  # Dijkstra
+                return 0
+            return math.hypot(bx - x, by - y) / speed
+
+        g = {a: 0}
+        prev = {a: None}  # poprzedni węzeł i FID krawędzi, którą do niego dotarliśmy
+        visited = set()
+        queue = [(heuristic(*self.coords(a)), a)]
+
+        while queue:
+            _, u = heapq.heappop(queue)
+            if u in visited:
+                continue
+            if u == b:
+                path = [b]
+                used_edges = []
+                while prev[path[-1]] is not None:
+                    u, fid = prev[path[-1]]
+                    used_edges.append(fid)
+                    path.append(u)
+                path.reverse()
+                used_edges.reverse()
+                return path, used_edges, g[b]
+            visited.add(u)
+
+            # współrzędne celów krawędzi są w kaflu węzła u - bez odwołań do kafli sąsiednich
+            data, i = self._locate(u)
+            targets, costs, fids = data['targets'], data[cost], data['edge_id']
+            target_x, target_y = data['target_x'], data['target_y']
+            for e in range(data['offsets'][i], data['offsets'][i + 1]):
+                v = targets[e]
+                if v in visited:
+                    continue
+                new_g = g[u] + costs[e]
+                if new_g < g.get(v, float('inf')):
+                    g[v] = new_g
+                    prev[v] = (u, fids[e])
+                    heapq.heappush(queue, (new_g + heuristic(target_x[e], target_y[e]), v))
+
+        return None, [], float('inf')
+
+    # Algorytm A* do wyszukiwania najszybszej trasy
+    def astar_fastest(self, a: int, b: int):
+        path, used_edges, _ = self._astar(a, b, 'time_cost', MAX_SPEED)
+        return path, used_edges
+
+    def astar(self, a: int, b: int):
+        path, used_edges, _ = self._astar(a, b, 'length', 1)
+        return path, used_edges
+
+    def dijkstra(self, a: int, b: int):
+        path, used_edges, total_distance = self._astar(a, b, 'length', 0)
+        return None, path, used_edges, total_distance
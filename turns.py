@@ -0,0 +1,224 @@
+import heapq
+import json
+import math
+import warnings
+
+from search_stats import SearchStats
+
+# Kąt skrętu (stopnie, > 0 - w lewo) z kierunku geometrii na końcu krawędzi wjazdu i na początku krawędzi
+# wyjazdu (Edge.bearings, odczytane przy wczytaniu warstwy); bez nich - z cięciw id_from -> id_to
+def turn_angle(in_edge, out_edge) -> float:
+    if in_edge.bearings is not None and out_edge.bearings is not None:
+        angle = out_edge.bearings[0] - in_edge.bearings[1]
+        if not math.isnan(angle):
+            return math.degrees(math.remainder(angle, 2 * math.pi))
+    (x0, y0), (x1, y1), (x2, y2) = in_edge.id_from, in_edge.id_to, out_edge.id_to
+    dx1, dy1, dx2, dy2 = x1 - x0, y1 - y0, x2 - x1, y2 - y1
+    return math.degrees(math.atan2(dx1 * dy2 - dy1 * dx2, dx1 * dx2 + dy1 * dy2))
+
+# Wyszukiwanie tras z zakazami skrętu i karami czasowymi za skręty. Stanem wyszukiwania jest
+# krawędź skierowana (graf krawędziowy), ale graf krawędziowy nie jest budowany - następniki
+# krawędzi to edges_out jej węzła końcowego, rozwijane dopiero przy ustaleniu krawędzi (kolejka heapq
+# z wpisami (f, edge.index) - przestarzałe wpisy są pomijane, jak w Graph._astar).
+# Dodatkowa pamięć to tylko zakazy i kary zadane jawnie oraz znacznik skrzyżowania dla odwiedzonych
+# węzłów; liczbę ustalonych stanów względem zwykłego A* mierzy benchmark.py (algorytm astar_turns).
+class TurnModel:
+    def __init__(self, graph, left_penalty: float = 8.0, right_penalty: float = 2.0, u_turn_penalty: float = 60.0,
+                 straight_angle: float = 30.0):
+        self.graph = graph
+        # kary (s) za skręt w skrzyżowaniu, zależne od kąta między kierunkami krawędzi
+        self.left_penalty = left_penalty
+        self.right_penalty = right_penalty
+        self.u_turn_penalty = u_turn_penalty  # zawrócenie (także poza skrzyżowaniem)
+        self.straight_angle = straight_angle  # odchylenie (stopnie) traktowane jako jazda na wprost
+        # zakazane manewry (FID odcinka wjazdu, współrzędne węzła, FID odcinka wyjazdu) - odcinki przylegające
+        # do węzła, czyli Edge.fids[-1] krawędzi wjazdu i Edge.fids[0] krawędzi wyjazdu (także po simplify)
+        self.restrictions = set()
+        self.penalties = dict()  # kary (s) dla konkretnych manewrów - zastępują karę wyliczoną z kąta
+        self.intersections = dict()  # węzeł -> czy jest skrzyżowaniem (liczone przy pierwszym użyciu)
+
+    def add_restriction(self, from_road: int, via: tuple, to_road: int):
+        key = self._maneuver(from_road, via, to_road)
+        if key is not None:
+            self.restrictions.add(key)
+
+    def set_penalty(self, from_road: int, via: tuple, to_road: int, seconds: float):
+        key = self._maneuver(from_road, via, to_road)
+        if key is not None:
+            self.penalties[key] = seconds
+
+    # Klucz manewru: via przyciągane jest do węzła grafu (tolerancja Graph.snap_index), tak jak końce dróg.
+    # Manewr, który nie pasuje do żadnego skrzyżowania, zgłaszany jest ostrzeżeniem (None - węzła brak).
+    def _maneuver(self, from_road: int, via: tuple, to_road: int):
+        node = self.graph.get_node(tuple(via))
+        if node is None:
+            warnings.warn(f"Manewr {from_road} -> {to_road}: brak węzła grafu w punkcie {tuple(via)}.")
+            return None
+        if not (any(edge.fids[-1] == from_road for edge in node.edges_in) and
+                any(edge.fids[0] == to_road for edge in node.edges_out)):
+            warnings.warn(f"Manewr {from_road} -> {to_road}: drogi nie łączą się w węźle {node.id}.")
+        return from_road, (node.x, node.y), to_road
+
+    # Odczyt zakazów i kar z pliku JSON, np.
+    # {"restrictions": [[12, [471000, 572000], 15]], "penalties": [[12, [471000, 572000], 16, 20]]}
+    @classmethod
+    def load(cls, graph, path: str, **options):
+        with open(path, encoding='utf-8') as file:
+            config = json.load(file)
+        model = cls(graph, **options)
+        for from_road, via, to_road in config.get('restrictions', []):
+            model.add_restriction(from_road, via, to_road)
+        for from_road, via, to_road, seconds in config.get('penalties', []):
+            model.set_penalty(from_road, via, to_road, seconds)
+        return model
+
+    # Węzeł łączący więcej niż dwie drogi; w pozostałych (załamania drogi) skręt nie jest karany
+    def _is_intersection(self, node) -> bool:
+        result = self.intersections.get(node)
+        if result is None:
+            roads = {edge.id_road for edge in node.edges_out} | {edge.id_road for edge in node.edges_in}
+            result = self.intersections[node] = len(roads) > 2
+        return result
+
+    # Koszt manewru z krawędzi in_edge na out_edge w węźle via; inf dla manewru zakazanego.
+    # Kary czasowe doliczane są tylko przy penalized=True (metryki czasu, nie 'length').
+    def turn_cost(self, in_edge, out_edge, via, penalized: bool = True) -> float:
+        key = (in_edge.fids[-1], in_edge.id_to, out_edge.fids[0])
+        if key in self.restrictions:
+            return math.inf
+        if not penalized:
+            return 0
+        if key in self.penalties:
+            return self.penalties[key]
+
+        if out_edge.id_road == in_edge.id_road and out_edge.id_to == in_edge.id_from:
+            return self.u_turn_penalty
+        angle = turn_angle(in_edge, out_edge)
+        if abs(angle) <= self.straight_angle or not self._is_intersection(via):
+            return 0
+        return self.left_penalty if angle > 0 else self.right_penalty
+
+    # A* po krawędziach skierowanych; zwraca (ścieżka, użyte krawędzie, koszt z karami za skręty)
+    def route(self, a, b, cost: str = 'time_cost', heuristic=None, stats: SearchStats = None):
+        graph = self.graph
+        heuristic = heuristic or graph.default_heuristic(cost)
+        if getattr(heuristic, 'cost', cost) != cost:
+            raise ValueError(f"Heurystyka dla metryki {heuristic.cost} nie pasuje do metryki {cost}.")
+        track = stats is not None
+        if track:
+            stats.start()
+        if a is b:
+            if track:
+                stats.finish(0, 0, 0, 0, initial=0)
+            return [a], [], 0
+
+        weight = graph.edge_weight(cost)
+        penalized = cost != 'length'
+        nodes, edges = graph.nodes, graph.edges
+        queue = []  # wpisy (f, edge.index)
+        pushes = 0
+        g = dict()  # koszt dotarcia do końca krawędzi
+        prev = dict()  # poprzednia krawędź trasy (None dla krawędzi wychodzących z a)
+        settled = set()
+        heap_max = 0
+
+        for edge in a.edges_out:
+            w = weight(edge)
+            if w < g.get(edge.index, math.inf):
+                g[edge.index] = w
+                prev[edge.index] = None
+                heapq.heappush(queue, (w + heuristic(nodes[edge.id_to], b), edge.index))
+                pushes += 1
+        initial = pushes
+
+        while queue:
+            if track and len(queue) > heap_max:
+                heap_max = len(queue)
+            _, i = heapq.heappop(queue)
+            if i in settled:
+                continue
+            settled.add(i)
+            edge = edges[i]
+            via = nodes[edge.id_to]
+
+            if via is b:
+                if track:
+                    stats.finish(pushes, len(queue), len(settled), heap_max, initial)
+                used_edges = []
+                while i is not None:
+                    used_edges.append(edges[i])
+                    i = prev[i]
+                used_edges.reverse()
+                return [a] + [nodes[edge.id_to] for edge in used_edges], used_edges, g[edge.index]
+
+            for out_edge in via.edges_out:
+                j = out_edge.index
+                if j in settled:
+                    continue
+                turn = self.turn_cost(edge, out_edge, via, penalized)
+                if turn == math.inf:
+                    continue
+                new_g = g[i] + turn + weight(out_edge)
+                if new_g < g.get(j, math.inf):
+                    g[j] = new_g
+                    prev[j] = i
+                    heapq.heappush(queue, (new_g + heuristic(nodes[out_edge.id_to], b), j))
+                    pushes += 1
+
+        if track:
+            stats.finish(pushes, len(queue), len(settled), heap_max, initial)
+        return None, [], math.inf
+
+    # Porównanie kosztów route z wyszukiwaniem wzorcowym (line_graph_cost) dla par węzłów;
+    # zwraca pary (a, b, koszt route, koszt wzorcowy), dla których wyniki się różnią
+    def verify(self, pairs, cost: str = 'time_cost', tolerance: float = 1e-6) -> list:
+        mismatches = []
+        for a, b in pairs:
+            found = self.route(a, b, cost)[2]
+            expected = line_graph_cost(self, a, b, cost)
+            if not (found == expected or abs(found - expected) <= tolerance * max(1, abs(expected))):
+                mismatches.append((a, b, found, expected))
+        return mismatches
+
+    # Odpowiedniki Graph.astar_fastest i Graph.astar z uwzględnieniem skrętów
+    def astar_fastest(self, a, b, heuristic=None, profile: str = None, stats: SearchStats = None):
+        path, used_edges, _ = self.route(a, b, profile or 'time_cost', heuristic, stats)
+        return path, used_edges
+
+    def astar(self, a, b, heuristic=None, stats: SearchStats = None):
+        path, used_edges, _ = self.route(a, b, 'length', heuristic, stats)
+        return path, used_edges
+
+# Wyszukiwanie wzorcowe do sprawdzania TurnModel.route: pełny graf krawędziowy (wszystkie manewry
+# z turn_cost, bez zakazanych) budowany z góry i zwykły Dijkstra po nim. Zwraca koszt trasy z a do b.
+def line_graph_cost(model: TurnModel, a, b, cost: str = 'time_cost') -> float:
+    graph = model.graph
+    if a is b:
+        return 0
+    weight = graph.edge_weight(cost)
+    penalized = cost != 'length'
+    successors = [[] for _ in graph.edges]
+    for edge in graph.edges:
+        via = graph.nodes[edge.id_to]
+        for out_edge in via.edges_out:
+            turn = model.turn_cost(edge, out_edge, via, penalized)
+            if turn != math.inf:
+                successors[edge.index].append((out_edge.index, turn + weight(out_edge)))
+
+    distances = [math.inf] * len(graph.edges)
+    queue = []
+    for edge in a.edges_out:
+        if weight(edge) < distances[edge.index]:
+            distances[edge.index] = weight(edge)
+            heapq.heappush(queue, (distances[edge.index], edge.index))
+    while queue:
+        distance, i = heapq.heappop(queue)
+        if distance > distances[i]:
+            continue
+        if graph.nodes[graph.edges[i].id_to] is b:
+            return distance
+        for j, w in successors[i]:
+            if distance + w < distances[j]:
+                distances[j] = distance + w
+                heapq.heappush(queue, (distances[j], j))
+    return math.inf